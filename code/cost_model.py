@@ -0,0 +1,778 @@
+from math import ceil, log, sqrt
+import itertools
+import operator
+import numpy as np
+import scipy.optimize as opt
+from scipy.special import gammaln
+from misc import comb, h
+
+##########################################################################
+#------------------------- COST EXPRESSIONS -----------------------------#
+##########################################################################
+
+class Expr:
+    """
+    Node of a symbolic cost expression. Expressions are built with the usual arithmetic operators and the nodes below.
+    """
+
+    def __add__(self, other):
+        return BinOp('+', self, as_expr(other))
+
+    def __radd__(self, other):
+        return BinOp('+', as_expr(other), self)
+
+    def __sub__(self, other):
+        return BinOp('-', self, as_expr(other))
+
+    def __rsub__(self, other):
+        return BinOp('-', as_expr(other), self)
+
+    def __mul__(self, other):
+        return BinOp('*', self, as_expr(other))
+
+    def __rmul__(self, other):
+        return BinOp('*', as_expr(other), self)
+
+    def __truediv__(self, other):
+        return BinOp('/', self, as_expr(other))
+
+    def __neg__(self):
+        return BinOp('*', Const(-1.), self)
+
+    @property
+    def children(self):
+        return ()
+
+    @property
+    def symbols(self):
+        """
+        Names of the free symbols the expression depends on.
+        """
+        if not hasattr(self, '_symbols'):
+            self._symbols = frozenset().union(*(c.symbols for c in self.children))
+        return self._symbols
+
+
+class Const(Expr):
+    def __init__(self, value: float):
+        self.value = float(value)
+
+
+class Sym(Expr):
+    def __init__(self, name: str):
+        self.name = name
+        self._symbols = frozenset([name])
+
+
+class BinOp(Expr):
+    def __init__(self, op: str, a: Expr, b: Expr):
+        self.op = op
+        self.a = a
+        self.b = b
+
+    @property
+    def children(self):
+        return (self.a, self.b)
+
+
+class Max(Expr):
+    def __init__(self, *args):
+        self.args = tuple(as_expr(a) for a in args)
+
+    @property
+    def children(self):
+        return self.args
+
+
+class Min(Expr):
+    def __init__(self, *args):
+        self.args = tuple(as_expr(a) for a in args)
+
+    @property
+    def children(self):
+        return self.args
+
+
+class Comb(Expr):
+    """
+    Log_2 of {a choose b} approximated by the binary entropy function, cf. misc.comb.
+    """
+    def __init__(self, a, b):
+        self.a = as_expr(a)
+        self.b = as_expr(b)
+
+    @property
+    def children(self):
+        return (self.a, self.b)
+
+
+class Maximize(Expr):
+    """
+    Maximum of body over the bound symbol var in [lo, hi]. The body is assumed to be unimodal in var (as for the wedge sizes).
+    """
+    def __init__(self, body: Expr, var: Sym, lo, hi):
+        self.body = as_expr(body)
+        self.var = var
+        self.lo = as_expr(lo)
+        self.hi = as_expr(hi)
+        self.argmax = ArgMax(self)
+
+    @property
+    def children(self):
+        return (self.body, self.lo, self.hi)
+
+    @property
+    def symbols(self):
+        if not hasattr(self, '_symbols'):
+            self._symbols = (self.body.symbols - {self.var.name}) | self.lo.symbols | self.hi.symbols
+        return self._symbols
+
+
+class ArgMax(Expr):
+    """
+    Maximizer of a Maximize node.
+    """
+    def __init__(self, of: Maximize):
+        self.of = of
+
+    @property
+    def children(self):
+        return (self.of,)
+
+
+class Switch(Expr):
+    """
+    Equals if_true where cond >= 0 and if_false elsewhere.
+    """
+    def __init__(self, cond, if_true, if_false):
+        self.cond = as_expr(cond)
+        self.if_true = as_expr(if_true)
+        self.if_false = as_expr(if_false)
+
+    @property
+    def children(self):
+        return (self.cond, self.if_true, self.if_false)
+
+
+def as_expr(x):
+    if isinstance(x, Expr):
+        return x
+    return Const(x)
+
+
+##########################################################################
+#---------------------------- COST MODELS -------------------------------#
+##########################################################################
+
+class CostModel:
+    """
+    Declarative definition of the cost of an NNS variant: named cost terms, the objective (runtime), the memory terms and the constraints over its parameters.
+    The symbols n and w refer to the dimension and the weight of the NNS instance.
+    """
+
+    penalty = 100 # Value of the runtime if the constraints are not satisfied, as in the runtime() functions
+    smooth = False # Smooth models have no penalty and use the continuous extension of comb outside its domain
+
+    def __init__(self, name: str, params: list):
+        self.name = name
+        self.params = [Sym(p) for p in params]
+        self.n = Sym('n')
+        self.w = Sym('w')
+        self.terms = {}
+        self.constraints = []
+        self.bounds = [(0, 1) for _ in params]
+        self.objective = None
+        self.memory = []
+        self.aux = [] # Auxiliary parameters of smooth models, as pairs (name, value at the optimum)
+
+    def __getitem__(self, name: str):
+        return self.terms[name]
+
+    def term(self, name: str, expr):
+        """
+        Declares the named cost term name and returns it.
+        """
+        self.terms[name] = as_expr(expr)
+        return self.terms[name]
+
+    def constrain(self, expr, label: str = ''):
+        """
+        Declares the constraint expr >= 0.
+        """
+        self.constraints.append((as_expr(expr), label))
+
+    def bound(self, param: Sym, lo, hi):
+        """
+        Declares the bounds lo <= param <= hi, where None means unbounded.
+        """
+        self.bounds[self.params.index(param)] = (lo if lo is None else as_expr(lo), hi if hi is None else as_expr(hi))
+
+    def compile(self):
+        """
+        Returns the compiled evaluators of the model. They are compiled once and cached per model.
+        """
+        if self.name not in _compiled_models:
+            _compiled_models[self.name] = CompiledModel(self)
+        return _compiled_models[self.name]
+
+    def smooth_branches(self):
+        """
+        Returns the smooth epigraph reformulations of the model, one per branch, see epigraph(). They are built once and cached per model.
+        """
+        if self.name not in _smooth_branches:
+            _smooth_branches[self.name] = epigraph(self)
+        return _smooth_branches[self.name]
+
+
+_compiled_models = {}
+_smooth_branches = {}
+
+
+##########################################################################
+#----------------------------- COMPILATION ------------------------------#
+##########################################################################
+
+def np_h(x):
+    """
+    Binary entropy function on arrays, with the same penalty as misc.h outside [0,1].
+    """
+    x = np.asarray(x, dtype=float)
+    inside = (x > 0) & (x < 1)
+    y = np.where(inside, x, 0.5)
+    res = -y*np.log2(y) - (1 - y)*np.log2(1 - y)
+    res = np.where(inside, res, 0.)
+    return np.where((x < 0) | (x > 1), -1000., res)
+
+def np_comb(a, b):
+    """
+    Log_2 of {a choose b} on arrays, cf. misc.comb.
+    """
+    a = np.asarray(a, dtype=float)
+    pos = a > 0
+    safe_a = np.where(pos, a, 1.)
+    return np.where(pos, a*np_h(b/safe_a), 0.)
+
+def np_smooth_comb(a, b):
+    """
+    Continuous extension of np_comb, which clips b/a to [0,1] instead of returning the penalty of misc.h.
+    """
+    a = np.asarray(a, dtype=float)
+    pos = a > 0
+    safe_a = np.where(pos, a, 1.)
+    return np.where(pos, a*np_h(np.clip(b/safe_a, 0, 1)), 0.)
+
+def np_exact_comb(a, b):
+    """
+    Exact log_2 of {a choose b} on arrays of integers (through the Gamma function), which is -inf if b is not in [0, a].
+    """
+    a, b = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+    inside = (b >= 0) & (b <= a)
+    a, b = np.where(inside, a, 0.), np.where(inside, b, 0.)
+    return np.where(inside, (gammaln(a + 1) - gammaln(b + 1) - gammaln(a - b + 1))/log(2), -np.inf)
+
+def smooth_comb(a: float, b: float):
+    """
+    Continuous extension of misc.comb, which clips b/a to [0,1] instead of returning the penalty of misc.h.
+    """
+    if a <= 0.:
+        return 0.
+    return a*h(min(max(b/a, 0.), 1.))
+
+
+class _Env:
+    """
+    Values of the symbols and cache of evaluated nodes during one evaluation.
+    """
+    def __init__(self, values: dict, cache: dict = None):
+        self.values = values
+        self.cache = {} if cache is None else cache
+
+
+class _Batch:
+    """
+    Primitives of the batched backend, on NumPy arrays.
+    """
+    ops = {'+': np.add, '-': np.subtract, '*': np.multiply, '/': np.divide}
+    maximum = staticmethod(np.maximum)
+    minimum = staticmethod(np.minimum)
+    comb = staticmethod(np_comb)
+    where = staticmethod(np.where)
+
+
+class _Point:
+    """
+    Primitives of the single point backend, on floats. This avoids the overhead of NumPy for the evaluations inside scipy.optimize.
+    """
+    ops = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv}
+    maximum = staticmethod(max)
+    minimum = staticmethod(min)
+    comb = staticmethod(comb)
+    where = staticmethod(lambda cond, a, b : a if cond else b)
+
+
+class _SmoothBatch(_Batch):
+    comb = staticmethod(np_smooth_comb)
+
+
+class _SmoothPoint(_Point):
+    comb = staticmethod(smooth_comb)
+
+
+class _Exact(_Batch):
+    """
+    Primitives of the exact backend, for concrete (integer) n, w and parameters. A Maximize is the log_2 of the sum over the integers in its range instead of the maximum.
+    """
+    comb = staticmethod(np_exact_comb)
+
+
+_invphi = (sqrt(5) - 1)/2
+
+
+class _Compiler:
+    """
+    Translates expressions into closures that evaluate them with the primitives of backend B. Every node is compiled once and evaluated once per evaluation.
+    """
+
+    def __init__(self, B, tol: float = 1e-10):
+        self.B = B
+        self._fns = {}
+        self._nodes = []
+        self._tol = tol
+        self._iters = ceil(log(tol)/log(_invphi))
+
+    def __call__(self, node: Expr):
+        node = as_expr(node)
+        key = id(node)
+        if key not in self._fns:
+            self._nodes.append(node) # Keeps the node alive, so that its id is not reused
+            raw = self._compile(node)
+            if isinstance(node, (Const, Sym)):
+                self._fns[key] = raw
+            else:
+                self._fns[key] = self._cached(key, raw)
+        return self._fns[key]
+
+    @staticmethod
+    def _cached(key, raw):
+        def fn(env):
+            if key not in env.cache:
+                env.cache[key] = raw(env)
+            return env.cache[key]
+        return fn
+
+    def _compile(self, node: Expr):
+        B = self.B
+        if isinstance(node, Const):
+            value = node.value
+            return lambda env: value
+        if isinstance(node, Sym):
+            name = node.name
+            return lambda env: env.values[name]
+        if isinstance(node, BinOp):
+            op, fa, fb = B.ops[node.op], self(node.a), self(node.b)
+            return lambda env: op(fa(env), fb(env))
+        if isinstance(node, (Max, Min)):
+            reduce_op = B.maximum if isinstance(node, Max) else B.minimum
+            fns = [self(a) for a in node.args]
+            def fn(env):
+                res = fns[0](env)
+                for f in fns[1:]:
+                    res = reduce_op(res, f(env))
+                return res
+            return fn
+        if isinstance(node, Comb):
+            fa, fb = self(node.a), self(node.b)
+            return lambda env: B.comb(fa(env), fb(env))
+        if isinstance(node, Switch):
+            fc, ft, ff = self(node.cond), self(node.if_true), self(node.if_false)
+            return lambda env: B.where(fc(env) >= 0, ft(env), ff(env))
+        if isinstance(node, Maximize):
+            fm = self._search(node)
+            return lambda env: fm(env)[1]
+        if isinstance(node, ArgMax):
+            fm = self._search(node.of)
+            return lambda env: fm(env)[0]
+        raise TypeError('Unknown expression node ' + type(node).__name__)
+
+    def _search(self, node: Maximize):
+        """
+        Golden section search (Brent's method for single points), returning the pair (argmax, max). The search is compiled and run once per Maximize node.
+        """
+        key = ('search', id(node))
+        if key not in self._fns:
+            self._fns[key] = self._cached(key, self._compile_search(node))
+        return self._fns[key]
+
+    def _compile_search(self, node: Maximize):
+        B = self.B
+        f_body, f_lo, f_hi = self(node.body), self(node.lo), self(node.hi)
+        var, iters, tol = node.var.name, self._iters, self._tol
+
+        # Subexpressions of the body that do not depend on var are evaluated once, outside the search
+        hoisted = []
+        def collect(e):
+            if var not in e.symbols:
+                if not isinstance(e, (Const, Sym)):
+                    hoisted.append(e)
+                return
+            for c in e.children:
+                collect(c)
+        collect(node.body)
+        f_hoisted = [(id(e), self(e)) for e in hoisted]
+
+        def fn(env):
+            shared = {key: f(env) for key, f in f_hoisted}
+            def body(x):
+                return f_body(_Env({**env.values, var: x}, dict(shared)))
+            a, b = f_lo(env), f_hi(env)
+            if issubclass(B, _Exact): # Sum over the integers, the argmax is the dominating one
+                a, b = np.broadcast_arrays(np.ceil(np.asarray(a, dtype=float) - tol), np.floor(np.asarray(b, dtype=float) + tol))
+                total, best, x = np.full(a.shape, -np.inf), np.full(a.shape, -np.inf), a
+                for k in range(int(np.max(np.nan_to_num(b - a, nan = -1, posinf = -1), initial = -1)) + 1):
+                    inside = a + k <= b
+                    fx = np.where(inside, body(np.minimum(a + k, b)), -np.inf)
+                    x, best = np.where(fx > best, a + k, x), np.maximum(best, fx)
+                    total = np.logaddexp2(total, fx)
+                return x, total
+            if issubclass(B, _Point): # Brent's method, as in wedge_size_LSF
+                x = opt.fminbound(lambda x : -body(x), a, max(a, b), xtol = tol) if b > a else a
+                return x, body(x)
+            a, b = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+            b = np.maximum(a, b) # An empty interval is searched at lo
+            c = b - _invphi*(b - a)
+            d = a + _invphi*(b - a)
+            fc, fd = body(c), body(d)
+            for _ in range(iters):
+                left = fc > fd # Maximum lies in [a, d]
+                a, b = B.where(left, a, c), B.where(left, d, b)
+                c, d = B.where(left, b - _invphi*(b - a), d), B.where(left, c, a + _invphi*(b - a))
+                fx = body(B.where(left, c, d))
+                fc, fd = B.where(left, fx, fd), B.where(left, fc, fx)
+            x = (a + b)/2
+            return x, body(x)
+        return fn
+
+
+class CompiledModel:
+    """
+    Evaluators of a CostModel. Points X are arrays of shape (..., number of parameters): a batch of points is evaluated with NumPy, a single point (of shape (number of parameters,)) with floats.
+    Points X can also be given as a tuple of arrays, one per parameter, which are broadcast against each other, so that the terms of few parameters are evaluated once per distinct value (e.g. on grids).
+    """
+
+    def __init__(self, model: CostModel):
+        self.model = model
+        self.name = model.name
+        self.dim = len(model.params)
+        self._backends = (_SmoothBatch, _SmoothPoint) if model.smooth else (_Batch, _Point)
+        self._fns = {}
+        for B in self._backends:
+            compiler = _Compiler(B)
+            self._fns[B] = {
+                'terms' : {name: compiler(e) for name, e in model.terms.items()},
+                'objective' : compiler(model.objective),
+                'memory' : [compiler(e) for e in model.memory],
+                'constraints' : [compiler(e) for e, _ in model.constraints],
+                'bounds' : [tuple(b if b is None else compiler(b) for b in bound) for bound in model.bounds],
+                'aux' : [compiler(e) for _, e in model.aux],
+            }
+
+    def _exact_fns(self):
+        """
+        Compiled functions of the exact backend, which are compiled on first use.
+        """
+        if _Exact not in self._fns:
+            compiler = _Compiler(_Exact)
+            self._fns[_Exact] = {
+                'terms' : {name: compiler(e) for name, e in self.model.terms.items()},
+                'constraints' : [compiler(e) for e, _ in self.model.constraints],
+            }
+        return self._fns[_Exact]
+
+    def _env(self, X, n: float, w: float, exact: bool = False):
+        """
+        Returns the backend, its compiled functions, the environment and the shape of the batch.
+        """
+        if isinstance(X, tuple):
+            columns = [np.asarray(x, dtype=float) for x in X]
+            shape = np.broadcast_shapes(*[x.shape for x in columns])
+        else:
+            X = np.asarray(X, dtype=float)
+            columns, shape = [X[..., i] for i in range(X.shape[-1])], X.shape[:-1]
+        if exact or isinstance(X, tuple):
+            values = {p.name: x for p, x in zip(self.model.params, columns)}
+            values['n'] = n
+            values['w'] = w
+            return self._exact_fns() if exact else self._fns[self._backends[0]], _Env(values), shape
+        B = self._backends[1] if X.ndim == 1 else self._backends[0]
+        if X.ndim == 1:
+            values = {p.name: float(X[i]) for i, p in enumerate(self.model.params)}
+        else:
+            values = {p.name: X[..., i] for i, p in enumerate(self.model.params)}
+        values['n'] = n
+        values['w'] = w
+        return self._fns[B], _Env(values), X.shape[:-1]
+
+    @staticmethod
+    def _shape(res, shape):
+        if shape == ():
+            return float(res)
+        return np.array(np.broadcast_to(np.asarray(res, dtype=float), shape))
+
+    def bounds(self, n: float = 1, w: float = 0.5):
+        """
+        Bounds on the parameters for the instance (n, w), in the format used by scipy.optimize.
+        """
+        env = _Env({'n': n, 'w': w})
+        return [tuple(b if b is None else float(b(env)) for b in bound) for bound in self._fns[self._backends[1]]['bounds']]
+
+    def term(self, name: str, X, n: float = 1, w: float = 0.5):
+        """
+        Evaluates the named cost term.
+        """
+        fns, env, shape = self._env(X, n, w)
+        return self._shape(fns['terms'][name](env), shape)
+
+    def terms(self, X, n: float = 1, w: float = 0.5, exact: bool = False):
+        """
+        Evaluates all named cost terms. Returns a dictionary name -> values.
+        If exact is 'True', n, w and the weights in X are concrete integers and the binomial coefficients are exact, so that the terms are log_2 counts (not divided by n).
+        """
+        fns, env, shape = self._env(X, n, w, exact)
+        return {name: self._shape(f(env), shape) for name, f in fns['terms'].items()}
+
+    def constraints(self, X, n: float = 1, w: float = 0.5, exact: bool = False):
+        """
+        Values of the constraints, all of which should be >= 0. Returns an array of shape (..., number of constraints).
+        """
+        fns, env, shape = self._env(X, n, w, exact)
+        return np.stack([self._shape(f(env), shape) for f in fns['constraints']], axis=-1)
+
+    def feasible(self, X, n: float = 1, w: float = 0.5, exact: bool = False):
+        """
+        Returns 'True' iff all constraints and bounds are satisfied.
+        """
+        ok = np.all(self.constraints(X, n, w, exact) >= 0, axis=-1)
+        columns = list(X) if isinstance(X, tuple) else list(np.moveaxis(np.asarray(X, dtype=float), -1, 0))
+        if exact: # The bounds are on the relative parameters
+            columns, n, w = [x/n for x in columns], 1, w/n
+        for x, (lo, hi) in zip(columns, self.bounds(n, w)):
+            if lo is not None:
+                ok = ok & (x >= lo)
+            if hi is not None:
+                ok = ok & (x <= hi)
+        return ok if np.ndim(ok) > 0 else bool(ok)
+
+    def runtime(self, X, n: float = 1, w: float = 0.5):
+        """
+        Log_2 of the runtime, with the penalty of the runtime() functions outside the feasible region (except for smooth models).
+        """
+        fns, env, shape = self._env(X, n, w)
+        if self.model.smooth:
+            return self._shape(fns['objective'](env), shape)
+        feasible = self.feasible(X, n, w)
+        if shape == ():
+            return self._shape(fns['objective'](env), shape) if feasible else self.model.penalty
+        return np.where(feasible, self._shape(fns['objective'](env), shape), self.model.penalty)
+
+    def memory(self, X, n: float = 1, w: float = 0.5):
+        """
+        Log_2 of the memory terms, as in the memory() functions. Returns an array of shape (..., number of memory terms).
+        """
+        fns, env, shape = self._env(X, n, w)
+        return np.stack([self._shape(f(env), shape) for f in fns['memory']], axis=-1)
+
+    def complete(self, x, n: float = 1, w: float = 0.5):
+        """
+        Extends the point x, given in the parameters of the original model, with the values of the auxiliary parameters of a smooth model.
+        """
+        B = self._backends[1]
+        x = [float(xi) for xi in x[:self.dim - len(self.model.aux)]]
+        values = {p.name: 0. for p in self.model.params}
+        values.update({p.name: xi for p, xi in zip(self.model.params, x)})
+        values['n'] = n
+        values['w'] = w
+        for (name, _), f in zip(self.model.aux, self._fns[B]['aux']): # Inner auxiliary parameters come first
+            values[name] = f(_Env(values))
+        return np.array(x + [values[name] for name, _ in self.model.aux])
+
+    def _jacobian(self, fun, x, step: float):
+        """
+        Central differences.
+        """
+        x = np.asarray(x, dtype=float)
+        E = step*np.eye(self.dim)
+        vals = np.array([fun(y) for y in np.concatenate([x + E, x - E])])
+        return (vals[:self.dim] - vals[self.dim:]).T/(2*step)
+
+    def gradient(self, x, n: float = 1, w: float = 0.5, step: float = 1e-8):
+        """
+        Gradient of the runtime at the point x.
+        """
+        return self._jacobian(lambda y: self.runtime(y, n, w), x, step)
+
+    def constraint_jacobian(self, x, n: float = 1, w: float = 0.5, step: float = 1e-8):
+        """
+        Jacobian of the constraints at the point x, of shape (number of constraints, number of parameters).
+        """
+        return self._jacobian(lambda y: self.constraints(y, n, w), x, step)
+
+    def scipy_constraints(self, n: float = 1, w: float = 0.5):
+        """
+        Constraints as a single vector-valued inequality with Jacobian, in the format used by SLSQP.
+        """
+        return [{ 'type' : 'ineq',
+                  'fun' : lambda x : self.constraints(x, n, w),
+                  'jac' : lambda x : self.constraint_jacobian(x, n, w)}]
+
+
+##########################################################################
+#----------------------- EPIGRAPH REFORMULATION -------------------------#
+##########################################################################
+
+def _signs(e: Expr, sign: int, signs: dict):
+    """
+    Collects the signs (+1, -1, or 0 if unknown) with which the Max, Min and Switch nodes occur in the piecewise linear structure of e.
+    Comb and Maximize are smooth atoms and are not entered.
+    """
+    if isinstance(e, (Max, Min, Switch)):
+        signs.setdefault(id(e), (e, set()))[1].add(sign)
+    if isinstance(e, BinOp):
+        if e.op == '+':
+            _signs(e.a, sign, signs)
+            _signs(e.b, sign, signs)
+        elif e.op == '-':
+            _signs(e.a, sign, signs)
+            _signs(e.b, -sign, signs)
+        elif e.op == '*' and isinstance(e.a, Const):
+            _signs(e.b, sign*int(np.sign(e.a.value)), signs)
+        elif e.op in '*/' and isinstance(e.b, Const):
+            _signs(e.a, sign*int(np.sign(e.b.value)), signs)
+        else:
+            _signs(e.a, 0, signs)
+            _signs(e.b, 0, signs)
+    elif isinstance(e, (Max, Min)):
+        for a in e.args:
+            _signs(a, sign, signs)
+    elif isinstance(e, Switch):
+        _signs(e.if_true, sign, signs)
+        _signs(e.if_false, sign, signs)
+
+
+class _Epigraph:
+    """
+    Rewrites the expressions of one branch: Max nodes that only occur with sign +1 (and Min nodes that only occur with sign -1) are replaced by auxiliary parameters with smooth constraints,
+    the other Max, Min and Switch nodes by the branch given in choices.
+    """
+
+    def __init__(self, epigraph: set, choices: dict):
+        self.epigraph = epigraph
+        self.choices = choices
+        self.constraints = []
+        self.aux = []
+        self._memo = {}
+
+    def __call__(self, e: Expr, top: bool = True):
+        key = (id(e), top)
+        if key not in self._memo:
+            self._memo[key] = self._rewrite(e, top)
+        return self._memo[key]
+
+    def _rewrite(self, e: Expr, top: bool):
+        if isinstance(e, (Const, Sym)):
+            return e
+        if isinstance(e, BinOp):
+            return BinOp(e.op, self(e.a, top), self(e.b, top))
+        if isinstance(e, Comb):
+            return Comb(self(e.a, False), self(e.b, False))
+        if isinstance(e, Maximize):
+            m = Maximize(self(e.body, False), e.var, self(e.lo, False), self(e.hi, False))
+            self._constrain_nonempty(m)
+            return m
+        if isinstance(e, ArgMax):
+            return self(e.of, False).argmax
+        if not top:
+            if isinstance(e, Switch):
+                return Switch(self(e.cond, False), self(e.if_true, False), self(e.if_false, False))
+            return type(e)(*(self(a, False) for a in e.args))
+        if isinstance(e, Switch):
+            cond = self(e.cond, False)
+            if self.choices[id(e)] == 0:
+                self.constraints.append((cond, 'switch'))
+                return self(e.if_true)
+            self.constraints.append((-cond, 'switch'))
+            return self(e.if_false)
+        args = [self(a) for a in e.args]
+        if id(e) in self.epigraph:
+            t = Sym('_t' + str(len(self.aux)))
+            for a in args:
+                self.constraints.append((t - a if isinstance(e, Max) else a - t, 'epigraph'))
+            self.aux.append((t.name, type(e)(*args)))
+            return t
+        k = self.choices[id(e)]
+        for a in args:
+            if a is not args[k]:
+                self.constraints.append((args[k] - a if isinstance(e, Max) else a - args[k], 'branch'))
+        return args[k]
+
+    def _constrain_nonempty(self, m: Maximize):
+        """
+        Requires the search interval of m to be nonempty, pairwise for the arguments of a Max lower bound and a Min upper bound.
+        """
+        los = m.lo.args if isinstance(m.lo, Max) else (m.lo,)
+        his = m.hi.args if isinstance(m.hi, Min) else (m.hi,)
+        for lo in los:
+            for hi in his:
+                if (hi.symbols | lo.symbols) - {'n', 'w'}:
+                    self.constraints.append((hi - lo, 'domain'))
+
+
+def _comb_domains(e: Expr, seen: set, domains: list):
+    """
+    Collects the constraints 0 <= b <= a for the binomials {a choose b} in e, outside the bodies of Maximize nodes.
+    """
+    if id(e) in seen:
+        return
+    seen.add(id(e))
+    if isinstance(e, Comb) and (e.a.symbols | e.b.symbols) - {'n', 'w'}:
+        domains.append((e.b, 'domain'))
+        domains.append((e.a - e.b, 'domain'))
+    children = (e.lo, e.hi) if isinstance(e, Maximize) else e.children
+    for c in children:
+        _comb_domains(c, seen, domains)
+
+
+def epigraph(model: CostModel):
+    """
+    Smooth epigraph reformulation of model, as a list of smooth CostModels, one per branch.
+    Every max(a, b) in the runtime that is minimized (occurs with positive sign) becomes an auxiliary parameter t with the constraints t >= a and t >= b, and similarly for min with negative sign.
+    Any other max, min or switch (such as the reusable-walk condition) is split into branches, where each branch fixes the active argument by constraints.
+    The penalties of runtime() and misc.h are replaced by the constraints of the model and the domains of the binomials.
+    Optimizing every branch and taking the best result gives the optimum of the original model.
+    """
+    signs = {}
+    _signs(model.objective, 1, signs)
+    epigraph, branched = set(), []
+    for key, (e, s) in signs.items():
+        if (isinstance(e, Max) and s == {1}) or (isinstance(e, Min) and s == {-1}):
+            epigraph.add(key)
+        else:
+            branched.append(e)
+    options = [range(2) if isinstance(e, Switch) else range(len(e.args)) for e in branched]
+
+    branches = []
+    for choice in itertools.product(*options):
+        rewrite = _Epigraph(epigraph, {id(e): k for e, k in zip(branched, choice)})
+        objective = rewrite(model.objective)
+        constraints = [(rewrite(e, False), label) for e, label in model.constraints] + rewrite.constraints
+        domains, seen = [], set()
+        for e in [objective] + [c for c, _ in constraints]:
+            _comb_domains(e, seen, domains)
+
+        m = CostModel(model.name + '/smooth' + ''.join('_' + str(k) for k in choice), [p.name for p in model.params] + [name for name, _ in rewrite.aux])
+        m.smooth = True
+        m.bounds = list(model.bounds) + [(None, None)]*len(rewrite.aux)
+        m.aux = rewrite.aux
+        m.objective = m.term('runtime', objective)
+        m.constraints = constraints + domains
+        branches.append(m)
+    return branches
@@ -0,0 +1,114 @@
+import numpy as np
+from cost_model import np_h
+
+# Interval arithmetic on NumPy arrays, for bounding the functions of misc over boxes. 
+# An interval is a pair (lo, hi) of arrays of the same shape. Results are rounded outwards. 
+
+eps_h = 1e-14 # Bound on the floating-point error of np_h, by which its results are widened
+
+def down(x):
+    return np.nextafter(x, -np.inf)
+
+def up(x):
+    return np.nextafter(x, np.inf)
+
+def point(x):
+    """
+    Degenerate interval [x, x].
+    """
+    x = np.asarray(x, dtype=float)
+    return (x, x)
+
+def add(a, b):
+    return (down(a[0] + b[0]), up(a[1] + b[1]))
+
+def sub(a, b):
+    return (down(a[0] - b[1]), up(a[1] - b[0]))
+
+def scale(c: float, a):
+    """
+    c*a for a constant c.
+    """
+    lo, hi = c*a[0], c*a[1]
+    if c < 0:
+        lo, hi = hi, lo
+    return (down(lo), up(hi))
+
+def h(x):
+    """
+    Binary entropy function on x cap [0,1], which is increasing on [0, 1/2] and decreasing on [1/2, 1].
+    """
+    lo, hi = np.clip(x[0], 0, 1), np.clip(x[1], 0, 1)
+    h_lo = np.minimum(np_h(lo), np_h(hi))
+    h_hi = np.where((lo <= 0.5) & (hi >= 0.5), 1., np.maximum(np_h(lo), np_h(hi)))
+    return (np.maximum(h_lo - eps_h, 0.), np.minimum(h_hi + eps_h, 1.))
+
+def comb(a, b):
+    """
+    Bounds on misc.comb(a, b) = a*h(b/a) over the points of the box a x b with 0 <= b <= a, the domain of the binomial.
+    It uses that comb is nonnegative and increasing in a, and concave in b with its maximum at b = a/2.
+    """
+    a_lo, a_hi = np.maximum(a[0], 0.), np.maximum(a[1], 0.)
+    b_lo, b_hi = np.maximum(b[0], 0.), np.minimum(b[1], a_hi)
+    def point_comb(a, b):
+        safe_a = np.where(a > 0, a, 1.)
+        return np.where(a > 0, a*np_h(np.clip(b/safe_a, 0, 1)), 0.)
+    lo = np.minimum(point_comb(a_lo, np.minimum(b_lo, a_lo)), point_comb(a_lo, np.minimum(np.maximum(b_hi, b_lo), a_lo)))
+    hi = point_comb(a_hi, np.clip(a_hi/2, b_lo, np.maximum(b_lo, b_hi)))
+    return (np.maximum(down(lo - eps_h*a_lo), 0.), up(hi + eps_h*a_hi))
+
+def h_inv(y, iters: int = 100):
+    """
+    Bounds on the inverse of the binary entropy function (from [0,1] to [0,1/2]), which is increasing.
+    Each end point is enclosed by a bisection that takes the error of np_h into account.
+    """
+    def bracket(y, side):
+        lo, hi = np.zeros_like(y), np.full_like(y, 0.5)
+        for _ in range(iters):
+            mid = (lo + hi)/2
+            below = np_h(mid) + side*eps_h < y # Then h_inv(y) > mid, also with the error of np_h
+            lo, hi = np.where(below, mid, lo), np.where(below, hi, mid)
+        return lo if side > 0 else hi
+    y_lo, y_hi = np.clip(y[0], 0, 1), np.clip(y[1], 0, 1)
+    return (bracket(y_lo, 1), bracket(y_hi, -1))
+
+def mul(a, b):
+    """
+    Product of intervals, where 0*inf is treated as unbounded.
+    """
+    with np.errstate(invalid='ignore'):
+        products = [a[0]*b[0], a[0]*b[1], a[1]*b[0], a[1]*b[1]]
+    lo = np.min([np.where(np.isnan(p), -np.inf, p) for p in products], axis=0)
+    hi = np.max([np.where(np.isnan(p), np.inf, p) for p in products], axis=0)
+    return (down(lo), up(hi))
+
+def _log2_ratio(num, den):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        res = np.log2(num/den)
+    res = np.where(num <= 0, -np.inf, res)
+    return np.where((den <= 0) & (num > 0), np.inf, res)
+
+def comb_da(a, b):
+    """
+    Bounds on the partial derivative log_2(a/(a - b)) of comb(a, b) with respect to a, which is decreasing in a and increasing in b.
+    """
+    lo = _log2_ratio(a[1], a[1] - np.maximum(b[0], 0.))
+    hi = _log2_ratio(a[0], a[0] - b[1])
+    return (down(lo - eps_h), up(hi + eps_h))
+
+def comb_db(a, b):
+    """
+    Bounds on the partial derivative log_2((a - b)/b) of comb(a, b) with respect to b, which is increasing in a and decreasing in b.
+    """
+    lo = _log2_ratio(a[0] - b[1], b[1])
+    hi = _log2_ratio(a[1] - np.maximum(b[0], 0.), np.maximum(b[0], 0.))
+    return (down(lo - eps_h), up(hi + eps_h))
+
+def inv(a):
+    """
+    1/a for intervals a that do not contain 0 (and unbounded otherwise).
+    """
+    with np.errstate(divide='ignore'):
+        lo, hi = 1/a[1], 1/a[0]
+    straddles = (a[0] <= 0) & (a[1] >= 0)
+    return (np.where(straddles, -np.inf, down(lo)), np.where(straddles, np.inf, up(hi)))
@@ -0,0 +1,169 @@
+import argparse
+import multiprocessing as mp
+import os
+import numpy as np
+import matplotlib.pyplot as plt
+from main import alg_choice, write_results
+from cost_model import CostModel
+
+##########################################################################
+#------------------------------- SCANNING -------------------------------#
+##########################################################################
+
+# The grid of (v, alpha) is split into chunks of cells, which are evaluated in batch with the compiled cost model of the algorithm, by a pool of processes.
+# The grid is passed as the columns (v, alpha) of the cells, so that the terms that only depend on v and alpha are evaluated once per cell.
+
+def qwalk_params(v, alpha, U, max_vertex_size):
+    """
+    Parameters (v, alpha, vertex_size, v_beta, beta) of a QW variant at the coordinates U in [0, 1]^3 (array of shape (..., 3)) of the cells (v, alpha) (arrays of shape (cells, 1)),
+    with beta = U_0*alpha, v_beta = beta + U_1*(v - alpha) and vertex_size = U_2*max_vertex_size, which satisfy the constraints of check_constraints_qwalk for v >= alpha.
+    """
+    beta = U[..., 0]*alpha
+    return (v, alpha, U[..., 2]*max_vertex_size, beta + U[..., 1]*(v - alpha), beta)
+
+def scan_chunk(alg_name: str, w: float, V, A, samples: int = 32, rounds: int = 4, seed = 0):
+    """
+    Runtime of alg_name at weight w on the cells (V, A) of a grid, and the parameters at which it is attained (penalty where infeasible).
+    For the QW variants, vertex_size, v_beta and beta are optimized out per cell by a batched random search in the coordinates of qwalk_params:
+    samples points (and the corners of [0, 1]^3) are evaluated per cell, followed by rounds of samples points in boxes of halving width around the best point of the cell.
+    """
+    model = alg_choice(alg_name)[0]._model.compile()
+    V, A = np.asarray(V, dtype=float), np.asarray(A, dtype=float)
+    if model.dim == 2:
+        return masked(model, w, model.runtime((V, A), 1, w), np.column_stack([V, A]))
+
+    v, alpha = V[:, None], A[:, None]
+    terms = model.terms((v, alpha, 0., 0., 0.), 1, w)
+    max_vertex_size = np.maximum(np.minimum(terms['bucket_size'], -terms['prob']/2), 0)
+    rng = np.random.default_rng(seed)
+    corners = np.array([[i >> 2 & 1, i >> 1 & 1, i & 1] for i in range(8)], dtype=float)
+    U = np.broadcast_to(np.vstack([corners, rng.random((samples, 3))]), (len(V), samples + 8, 3))
+    best_t, best_U = np.full(len(V), np.inf), np.zeros((len(V), 3))
+    for r in range(rounds + 1):
+        T = model.runtime(qwalk_params(v, alpha, U, max_vertex_size), 1, w)
+        i = np.argmin(T, axis = 1)
+        better = T[np.arange(len(V)), i] < best_t
+        best_t = np.where(better, T[np.arange(len(V)), i], best_t)
+        best_U = np.where(better[:, None], U[np.arange(len(V)), i], best_U)
+        U = np.clip(best_U[:, None] + 0.5**(r + 1)*(rng.random((len(V), samples, 3)) - 0.5), 0, 1)
+    return masked(model, w, best_t, np.column_stack([np.ravel(x) for x in np.broadcast_arrays(*qwalk_params(v, alpha, best_U[:, None], max_vertex_size))]))
+
+def masked(model, w: float, T, X):
+    """
+    Runtimes T with the penalty where the parameters X violate a constraint of the model, which includes the rules of check_constraints and an empty search range of a wedge
+    (where the runtime would be finite because of the penalty of misc.h). Returns T and X.
+    """
+    return np.where(model.feasible(X, 1, w), T, model.model.penalty), X
+
+def scan(alg_name: str, w: float, V, A, samples: int = 32, rounds: int = 4, chunk: int = 2**12, processes: int = None, seed: int = 0):
+    """
+    Landscape of the runtime of alg_name at weight w on the grid V x A of (v, alpha), computed in chunks of chunk cells by a pool of processes
+    (by default one per CPU, no pool for one process). See scan_chunk for the QW variants.
+    """
+    if processes is None:
+        processes = os.cpu_count()
+    VV, AA = np.meshgrid(np.asarray(V, dtype=float), np.asarray(A, dtype=float))
+    V_cells, A_cells = VV.ravel(), AA.ravel()
+    tasks = [(alg_name, w, V_cells[i:i + chunk], A_cells[i:i + chunk], samples, rounds, [seed, i]) for i in range(0, len(V_cells), chunk)]
+    if processes == 1:
+        results = [scan_chunk(*task) for task in tasks]
+    else:
+        with mp.get_context('spawn').Pool(processes) as pool:
+            results = pool.starmap(scan_chunk, tasks)
+    T = np.concatenate([t for t, _ in results]).reshape(VV.shape)
+    X = np.concatenate([x for _, x in results]).reshape(VV.shape + (-1,))
+    return Landscape(alg_name, w, V, A, T, X)
+
+##########################################################################
+#------------------------------ LANDSCAPE -------------------------------#
+##########################################################################
+
+class Landscape:
+    """
+    Runtime T of an algorithm at weight w on a grid of (v, alpha): T[j, i] is the runtime at (V[i], A[j]) with the parameters X[j, i], and NaN where no parameters satisfy the constraints.
+    """
+
+    def __init__(self, alg_name: str, w: float, V, A, T, X):
+        self.alg_name = alg_name
+        self.w = w
+        self.V, self.A = np.asarray(V, dtype=float), np.asarray(A, dtype=float)
+        self.T = np.where(np.asarray(T, dtype=float) < CostModel.penalty, T, np.nan) # Masks the infeasible cells
+        self.X = np.asarray(X, dtype=float)
+
+    def argmin(self):
+        """
+        Minimal runtime on the grid and its parameters, or (NaN, None) if no cell is feasible.
+        """
+        if np.all(np.isnan(self.T)):
+            return np.nan, None
+        j, i = np.unravel_index(np.nanargmin(self.T), self.T.shape)
+        return self.T[j, i], self.X[j, i]
+
+    def optimize(self, iters: int = 20, prec: float = 1e-10, min_val: int = 1000, max_iter: int = 2000):
+        """
+        Optimizes the parameters of the algorithm with its optimizer, where the first iteration starts from the argmin of the grid.
+        """
+        alg, optimizer, _ = alg_choice(self.alg_name)
+        alg._n = 1
+        alg._w = self.w
+        return optimizer.optimize(iters, prec, min_val, max_iter, start = self.argmin()[1])
+
+    def filename(self):
+        """
+        Name of the files (without extension) in which the landscape is stored.
+        """
+        return self.alg_name + '_landscape_w' + str(self.w) + '_v' + str(len(self.V)) + '_a' + str(len(self.A))
+
+    def write(self, dir: str = '../data/landscapes/'):
+        """
+        Writes the rows [v, alpha, t, params] of all cells into dir/filename().csv.
+        """
+        rows = [[self.V[i], self.A[j], self.T[j, i], list(self.X[j, i])] for j in range(len(self.A)) for i in range(len(self.V))]
+        write_results(rows, dir, self.filename())
+
+    def plot(self, directory: str = 'plots/'):
+        """
+        Heatmap of the landscape, with the argmin of the grid, in directory/filename().png.
+        """
+        plt.clf()
+        plt.imshow(self.T, origin = 'lower', aspect = 'auto', extent = [self.V[0], self.V[-1], self.A[0], self.A[-1]])
+        plt.colorbar(label = r'$c$' + ' s.t. runtime is ' + r'$2^{cn}$')
+        t, x = self.argmin()
+        if x is not None:
+            plt.plot(x[0], x[1], 'rx', label = 'argmin: %.5f' % t)
+            plt.legend(loc = 'upper left')
+        plt.title('Runtime of ' + self.alg_name + ' for ' + r'$\omega$' + ' = ' + str(self.w))
+        plt.xlabel(r'$v$')
+        plt.ylabel(r'$\alpha$')
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        plt.savefig(directory + self.filename() + '.png')
+
+##########################################################################
+#--------------------------- DRIVER CODE --------------------------------#
+##########################################################################
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Runtime landscape of an algorithm on a grid of (v, alpha) at fixed weight.')
+    parser.add_argument('--alg', default = 'RPC')
+    parser.add_argument('--omega', type = float, default = 0.1, help = 'relative weight w/n')
+    parser.add_argument('--v_max', type = float, default = 0.5)
+    parser.add_argument('--grid', type = int, nargs = 2, default = [200, 200], help = 'number of values of v and of alpha')
+    parser.add_argument('--samples', type = int, default = 32, help = 'points per cell and round for the QW variants')
+    parser.add_argument('--rounds', type = int, default = 4)
+    parser.add_argument('--chunk', type = int, default = 2**12, help = 'cells per task')
+    parser.add_argument('--processes', type = int, default = None)
+    parser.add_argument('--optimize', action = 'store_true', help = 'optimize the parameters from the argmin of the grid')
+    args = parser.parse_args()
+
+    L = scan(args.alg, args.omega, np.linspace(0, args.v_max, args.grid[0]), np.linspace(0, args.omega, args.grid[1]),
+             args.samples, args.rounds, args.chunk, args.processes)
+    L.write()
+    L.plot()
+    t, x = L.argmin()
+    print("Grid argmin :", t, x)
+    if args.optimize and x is not None:
+        params = L.optimize()
+        alg = alg_choice(args.alg)[0]
+        alg._w = args.omega
+        print("Optimum :", alg.runtime(*params), params)
@@ -1,7 +1,9 @@
 from math import *
+import numpy as np
 import scipy.optimize as opt
 import matplotlib.pyplot as plt
 from misc import comb, calc_w_from_GV, list_size
+import interval as iv
 
 
 def p2(k_ISD, n_NNS, w_NNS):   
@@ -113,6 +115,141 @@ def check_claim_using_fminbound(range_rates = 100, prec = 1e-7):
     lst_of_times = [lst_of_lb, lst_of_qP]
     return lst_of_times, lst_of_checks 
 
+### Functions for verifying our claim by branch and bound 
+
+def claim_bounds(K, N, W): 
+    """ 
+    Interval bounds over the boxes K x N x W (of k_ISD, n_NNS, w_NNS) on the constraints of check_constraints, which should all be >= 0, 
+    and on quantum_SievingISD_lower_bound - quantum_Prange, which should be >= 0 by our claim. 
+    The domain of the binomials in list_size (w_NNS/2 <= n_NNS - w_NNS) is included as a constraint, outside of which the penalty of misc.h applies.
+    """
+    one = iv.point(1.)
+    w_ISD = iv.h_inv(iv.sub(one, K))
+    n_minus_k = iv.sub(N, K)
+    comb_nw = iv.comb(N, W)
+    comb_half = iv.comb(iv.sub(N, W), iv.scale(0.5, W)) 
+    N_min = iv.sub(iv.sub(comb_nw, W), comb_half) # list_size, using comb(w, w/2) = w 
+    constraints = [
+        n_minus_k, # k_ISD <= n_NNS
+        iv.sub(one, N), # n_NNS <= 1
+        iv.sub(w_ISD, W), # w_NNS <= w_ISD
+        iv.sub(N, W), # w_NNS <= n_NNS
+        iv.sub(iv.sub(one, N), iv.sub(w_ISD, W)), # (w_ISD - w_NNS) <= (1 - n_NNS)
+        iv.sub(comb_nw, n_minus_k), # (n_NNS - k_ISD) <= comb(n_NNS, w_NNS)
+        iv.sub(iv.add(W, comb_half), n_minus_k), # p2 <= 0
+        iv.sub(N, iv.scale(1.5, W)), # w_NNS/2 <= n_NNS - w_NNS
+    ]
+    # (N_min + comb(1, w_ISD) - (n_NNS - k_ISD) - comb(1 - n_NNS, w_ISD - w_NNS))/2 - (comb(1, w_ISD) - comb(1 - k_ISD, w_ISD))/2
+    diff = iv.scale(0.5, iv.add(iv.sub(iv.sub(N_min, n_minus_k), iv.comb(iv.sub(one, N), iv.sub(w_ISD, W))), iv.comb(iv.sub(one, K), w_ISD)))
+    return constraints, diff
+
+def claim_gradient_bounds(K, N, W): 
+    """ 
+    Interval bounds over the boxes K x N x W on the partial derivatives of quantum_SievingISD_lower_bound - quantum_Prange with respect to k_ISD, n_NNS and w_NNS. 
+    Uses d/da comb(a, b) = log_2(a/(a - b)), d/db comb(a, b) = log_2((a - b)/b) and d/dk w_ISD = -1/log_2((1 - w_ISD)/w_ISD). 
+    """
+    one = iv.point(1.)
+    w_ISD = iv.h_inv(iv.sub(one, K))
+    n_w, half_w = iv.sub(N, W), iv.scale(0.5, W)
+    one_n, w_ISD_w, one_k = iv.sub(one, N), iv.sub(w_ISD, W), iv.sub(one, K)
+    d_w_ISD = iv.mul(iv.point(-1.), iv.inv(iv.comb_db(one, w_ISD)))
+    d_k = iv.add(iv.sub(iv.sub(one, iv.mul(iv.comb_db(one_n, w_ISD_w), d_w_ISD)), iv.comb_da(one_k, w_ISD)), iv.mul(iv.comb_db(one_k, w_ISD), d_w_ISD))
+    d_n = iv.sub(iv.add(iv.sub(iv.comb_da(N, W), iv.comb_da(n_w, half_w)), iv.comb_da(one_n, w_ISD_w)), one)
+    d_w = iv.add(iv.sub(iv.add(iv.sub(iv.comb_db(N, W), one), iv.comb_da(n_w, half_w)), iv.scale(0.5, iv.comb_db(n_w, half_w))), iv.comb_db(one_n, w_ISD_w))
+    return [iv.scale(0.5, d) for d in (d_k, d_n, d_w)]
+
+def claim_diff_bounds(boxes): 
+    """ 
+    Interval bounds on quantum_SievingISD_lower_bound - quantum_Prange over the boxes, as the intersection of the natural interval extension (see claim_bounds) 
+    and the mean value form diff(mid) + sum_i d_i diff(box) * (x_i - mid_i), which is much tighter on small boxes inside the domain of the binomials. 
+    Returns the constraint intervals and the interval of the difference. 
+    """
+    K, N, W = [(boxes[:, i, 0], boxes[:, i, 1]) for i in range(3)]
+    constraints, diff = claim_bounds(K, N, W)
+    mid, radius = (boxes[:, :, 0] + boxes[:, :, 1])/2, (boxes[:, :, 1] - boxes[:, :, 0])/2
+    diff_mid = claim_bounds(*[iv.point(mid[:, i]) for i in range(3)])[1]
+    spread = np.zeros(len(boxes))
+    with np.errstate(over = 'ignore', invalid = 'ignore'): # Derivatives are unbounded at the boundary of the domain
+        for i, d in enumerate(claim_gradient_bounds(K, N, W)): 
+            spread = iv.up(spread + np.maximum(np.abs(d[0]), np.abs(d[1]))*radius[:, i])
+    spread = np.where(np.isnan(spread), np.inf, spread)
+    diff = (np.maximum(diff[0], iv.down(diff_mid[0] - spread)), np.minimum(diff[1], iv.up(diff_mid[1] + spread)))
+    return constraints, diff
+
+def contract_boxes(boxes): 
+    """ 
+    Shrinks the boxes (of shape (number of boxes, 3, 2)) to the part where the constraints of check_constraints can hold, using 
+    n_NNS <= k_ISD + w_NNS + comb(n_NNS - w_NNS, w_NNS/2) (p2 <= 0), n_NNS <= k_ISD + comb(n_NNS, w_NNS), w_NNS <= w_ISD and w_NNS <= n_NNS. 
+    Returns the contracted boxes and whether they are empty. 
+    """
+    K, N, W = [(boxes[:, i, 0], boxes[:, i, 1]) for i in range(3)]
+    w_ISD = iv.h_inv(iv.sub(iv.point(1.), K))
+    comb_half = iv.comb(iv.sub(N, W), iv.scale(0.5, W))
+    comb_nw = iv.comb(N, W)
+    boxes = boxes.copy()
+    boxes[:, 1, 1] = np.minimum(N[1], np.minimum(iv.add(iv.add(K, W), comb_half)[1], iv.add(K, comb_nw)[1]))
+    boxes[:, 2, 1] = np.minimum(W[1], np.minimum(w_ISD[1], N[1]))
+    return boxes, np.any(boxes[:, :, 1] < boxes[:, :, 0], axis=1)
+
+def check_claim_using_branch_and_bound(k_min = 0.01, k_max = 0.99, tol = 1e-4, min_width = 1e-7, chunk = 100000): 
+    """ 
+    Verifies the claim (lower bound >= quantum Prange) for all rates in [k_min, k_max] and all feasible n_NNS, w_NNS, using interval arithmetic over boxes of (k_ISD, n_NNS, w_NNS). 
+    Boxes are first contracted to the part where the constraints can hold (see contract_boxes). Boxes that provably satisfy the claim up to tol, or that provably violate a constraint, are pruned; the others are bisected along their widest side, until their sides are below min_width (relative to the initial box). 
+    The tolerance tol is needed because the claim is tight for n_NNS = k_ISD and w_NNS = 0, where SievingISD reduces to Prange. 
+    Returns a certificate: the claim holds (up to tol) iff both 'counterexamples' (boxes in which every point is feasible and violates the claim) and 'unresolved' are empty. 
+    """
+    init = np.array([[k_min, k_max], [k_min, 1.], [0., 0.5]])
+    width = init[:, 1] - init[:, 0]
+    stack = [init[None]]
+    counterexamples, unresolved = [], []
+    num_proven = num_infeasible = num_boxes = 0
+
+    while stack:
+        boxes = stack.pop()
+        if len(boxes) > chunk:
+            stack.append(boxes[chunk:])
+            boxes = boxes[:chunk]
+        num_boxes += len(boxes)
+        boxes, empty = contract_boxes(boxes)
+        constraints, diff = claim_diff_bounds(boxes)
+        infeasible = empty | np.any([c[1] < 0 for c in constraints], axis=0)
+        feasible = np.all([c[0] >= 0 for c in constraints], axis=0)
+        proven = ~infeasible & (diff[0] >= -tol)
+        violated = ~infeasible & ~proven & feasible & (diff[1] < 0)
+        num_infeasible += np.sum(infeasible)
+        num_proven += np.sum(proven)
+        counterexamples.append(boxes[violated])
+
+        # Bisect the remaining boxes along their widest side (relative to the initial box) 
+        rest = boxes[~infeasible & ~proven & ~violated]
+        rel_width = (rest[:, :, 1] - rest[:, :, 0])/width
+        small = np.max(rel_width, axis=1) < min_width
+        unresolved.append(rest[small])
+        rest, rel_width = rest[~small], rel_width[~small]
+        if len(rest) > 0:
+            side = np.argmax(rel_width, axis=1)
+            idx = np.arange(len(rest))
+            mid = (rest[idx, side, 0] + rest[idx, side, 1])/2
+            left, right = rest.copy(), rest.copy()
+            left[idx, side, 1] = mid
+            right[idx, side, 0] = mid
+            stack.append(np.concatenate([left, right]))
+
+    counterexamples, unresolved = np.concatenate(counterexamples), np.concatenate(unresolved)
+    print("Boxes evaluated = ", num_boxes, ", proven = ", num_proven, ", infeasible = ", num_infeasible)
+    if len(counterexamples) > 0: 
+        print("Claim violated in ", len(counterexamples), " boxes, e.g. (k_ISD, n_NNS, w_NNS) in ", counterexamples[0].tolist())
+    elif len(unresolved) > 0: 
+        print("Claim unresolved in ", len(unresolved), " boxes, e.g. (k_ISD, n_NNS, w_NNS) in ", unresolved[0].tolist())
+    else: 
+        print("Claim proven for all rates in [", k_min, ",", k_max, "] up to ", tol)
+    return {'claim' : len(counterexamples) == 0 and len(unresolved) == 0, 
+            'counterexamples' : counterexamples, 
+            'unresolved' : unresolved, 
+            'boxes' : num_boxes, 
+            'proven' : num_proven, 
+            'infeasible' : num_infeasible}
+
 def plot_comparison(lst_of_times): #lst_of_times contains lb and qP times 
     L_lb = lst_of_times[0]
     label_lb = "lower bound Quantum SievingISD"
@@ -129,6 +266,7 @@ def plot_comparison(lst_of_times): #lst_of_times contains lb and qP times
 
 
 ### Driver code
-    
-lst_of_times, lst_of_checks = check_claim_using_fminbound(range_rates = 100, prec = 1e-10) 
-plot_comparison(lst_of_times)
\ No newline at end of file
+
+if __name__ == '__main__': 
+    lst_of_times, lst_of_checks = check_claim_using_fminbound(range_rates = 100, prec = 1e-10) 
+    plot_comparison(lst_of_times)
\ No newline at end of file
@@ -0,0 +1,167 @@
+import os
+import re
+import csv
+import numpy as np
+import scipy.optimize as opt
+from scipy.interpolate import CubicSpline, PchipInterpolator
+from main import alg_choice
+from optimizer import validity
+from cost_model import CostModel
+
+##########################################################################
+#------------------------- READING SWEEP RESULTS ------------------------#
+##########################################################################
+
+number = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?|[-+]?inf|nan')
+
+def parse_cell(cell: str):
+    """
+    Numbers in a cell of a file written by main.write_results, which is a number or the string of a tuple or list of numbers (possibly as np.float64(...)).
+    """
+    return [float(x) for x in number.findall(cell.replace('np.float64', ''))]
+
+def read_sweep(dir: str, filename: str):
+    """
+    Reads the table [w, t, m, params] of time_memory from dir/filename. Returns arrays of weights, times, memories (one column per component) and parameters (one column per parameter).
+    """
+    W, T, M, P = [], [], [], []
+    with open(os.path.join(dir, filename), newline='') as csvfile:
+        reader = csv.reader(csvfile, delimiter=' ')
+        for row in reader:
+            W.append(float(row[0]))
+            T.append(float(row[1]))
+            M.append(parse_cell(row[2]))
+            P.append(parse_cell(row[3]) if len(row) > 3 else [])
+    return np.array(W), np.array(T), np.array(M, dtype=float).reshape(len(W), -1), np.array(P, dtype=float).reshape(len(W), -1)
+
+def sweep_files(dir: str, alg_name: str):
+    """
+    Files in dir with results of time_memory for alg_name (named as in main.results_filename), from the finest to the coarsest range of weights,
+    where files with default settings come before those with non-default ones.
+    """
+    pattern = re.compile(re.escape(alg_name) + r'_w(\d+)_i(\d+)_p([^_]+)((?:_m[^_]+)?(?:_x\d+)?(?:_smooth)?(?:_active_set)?)\.csv$')
+    matches = [(m, f) for f in os.listdir(dir) for m in [pattern.match(f)] if m is not None]
+    return [f for m, f in sorted(matches, key=lambda mf : (-int(mf[0].group(1)), -int(mf[0].group(2)), mf[0].group(4) != ''))]
+
+##########################################################################
+#----------------------------- INDEX ------------------------------------#
+##########################################################################
+
+class OptimumIndex:
+    """
+    Index of the optimal runtime exponent t, memory and parameters of an algorithm by weight w, built from the sorted weights of a sweep of time_memory.
+    Queries interpolate between the grid points in O(log n), with the monotone piecewise cubic interpolation of PCHIP (method = 'pchip') or a cubic spline (method = 'spline').
+    The error bound of a query in [w_i, w_{i+1}] is (w - w_i)(w_{i+1} - w) max |f[w_{j-1}, w_j, w_{j+1}]| for j = i, i+1, with the second divided differences of the neighbouring grid points,
+    which bounds the error of linear interpolation of functions whose second derivative is bounded by the neighbouring ones (and is conservative for the cubic interpolations).
+    """
+
+    def __init__(self, alg_name: str, W, T, M, P, method: str = 'pchip'):
+        self.alg_name = alg_name
+        W, unique = np.unique(np.asarray(W, dtype=float), return_index = True) # Sorted, without repeated weights
+        if len(W) < 2:
+            raise ValueError('At least two weights are needed for an index.')
+        self.W = W
+        self.T, self.M, self.P = np.asarray(T, dtype=float)[unique], np.asarray(M, dtype=float)[unique], np.asarray(P, dtype=float)[unique]
+        Y = np.column_stack([self.T, self.M, self.P])
+
+        match method:
+            case 'pchip':
+                self._interpolator = PchipInterpolator(W, Y, axis = 0, extrapolate = True)
+            case 'spline':
+                self._interpolator = CubicSpline(W, Y, axis = 0, bc_type = 'not-a-knot' if len(W) > 3 else 'natural')
+            case _:
+                raise ValueError('Unknown interpolation method ' + method + '.')
+
+        # Largest second divided difference of the neighbouring grid points, per interval [w_i, w_{i+1}]
+        slopes = np.diff(Y, axis = 0)/np.diff(W)[:, None]
+        dd2 = np.abs(np.diff(slopes, axis = 0))/(W[2:] - W[:-2])[:, None]
+        dd2 = np.vstack([dd2[:1], dd2, dd2[-1:]]) if len(dd2) > 0 else np.zeros((2, Y.shape[1]))
+        self._dd2 = np.maximum(dd2[:-1], dd2[1:])
+
+    @classmethod
+    def from_results(cls, alg_name: str, L: list, method: str = 'pchip'):
+        """
+        Index of the list L of rows [w, t, m, params] returned by main.time_memory.
+        """
+        W = [row[0] for row in L]
+        T = [row[1] for row in L]
+        M = [np.ravel(row[2]) for row in L]
+        P = [np.ravel(row[3]) for row in L]
+        return cls(alg_name, W, T, np.array(M, dtype=float).reshape(len(L), -1), np.array(P, dtype=float).reshape(len(L), -1), method)
+
+    @classmethod
+    def load(cls, dir: str, alg_name: str, filename: str = None, method: str = 'pchip'):
+        """
+        Index of the results of alg_name stored in dir, by default from the file with the finest range of weights (see sweep_files).
+        """
+        if filename is None:
+            files = sweep_files(dir, alg_name)
+            if not files:
+                raise FileNotFoundError('No results for ' + alg_name + ' in ' + dir + '.')
+            filename = files[0]
+        return cls(alg_name, *read_sweep(dir, filename), method)
+
+    def _split(self, Y):
+        k = self.M.shape[1]
+        return Y[..., 0], Y[..., 1:1 + k], Y[..., 1 + k:]
+
+    def error_bound(self, w):
+        """
+        Error bounds of the interpolated [t, m..., params...] at the weights w (array of shape w.shape + (1 + components of m + number of params,)), which is inf outside the grid.
+        """
+        w = np.asarray(w, dtype=float)
+        i = np.clip(np.searchsorted(self.W, w, side = 'right') - 1, 0, len(self.W) - 2)
+        err = ((w - self.W[i])*(self.W[i + 1] - w))[..., None]*self._dd2[i]
+        inside = (w >= self.W[0]) & (w <= self.W[-1])
+        return np.where(inside[..., None], err, np.inf)
+
+    def query_batch(self, w):
+        """
+        Interpolated runtime exponents T, memories M, parameters P and error bounds E of T at the array of weights w.
+        """
+        w = np.asarray(w, dtype=float)
+        T, M, P = self._split(self._interpolator(w))
+        return T, M, P, self.error_bound(w)[..., 0]
+
+    def query(self, w: float, tol: float = None, solve: bool = False, prec: float = 1e-10, max_iter: int = 2000):
+        """
+        Interpolated runtime exponent t, memory m, parameters params and error bound err of t at weight w.
+        If solve is 'True' and err > tol, the parameters are instead optimized for weight w by a local solve started at the interpolated parameters,
+        in which case t and m are those of the algorithm and err = 0 (or the interpolated values are returned if the solve fails).
+        """
+        T, M, P, E = self.query_batch(w)
+        t, m, params, err = float(T), M, P, float(E)
+        if solve and tol is not None and err > tol:
+            solution = self.solve(w, params, prec, max_iter)
+            if solution is not None:
+                return solution
+        return t, m, params, err
+
+    def solve(self, w: float, start, prec: float = 1e-10, max_iter: int = 2000):
+        """
+        Local optimization of the parameters of the algorithm for weight w from start with its optimizer. Returns (t, m, params, 0.), or None if no valid optimum is found,
+        which includes results with the penalty runtime (validity allows violations up to prec, but the runtime() functions check the constraints strictly).
+        """
+        alg, optimizer, _ = alg_choice(self.alg_name)
+        alg._n = 1
+        alg._w = w
+        if optimizer is None:
+            return alg.runtime(), np.ravel(alg.memory()), np.array([]), 0.
+        result = opt.minimize(optimizer.opt_func,
+                            np.clip(start, 0, None),
+                            bounds = optimizer.bounds,
+                            constraints = optimizer.constrs,
+                            tol = prec,
+                            options = {'maxiter':max_iter})
+        if not (result.success and validity(optimizer.constrs, result.x, tol = prec)):
+            return None
+        t = alg.runtime(*result.x)
+        if t >= CostModel.penalty:
+            return None
+        return t, np.ravel(alg.memory(*result.x)), result.x, 0.
+
+def load_indexes(dir: str, alg_names: list, method: str = 'pchip'):
+    """
+    Dictionary alg_name -> OptimumIndex of the results stored in dir, for the algorithms in alg_names that have results.
+    """
+    return {alg_name : OptimumIndex.load(dir, alg_name, method = method) for alg_name in alg_names if sweep_files(dir, alg_name)}
@@ -2,6 +2,7 @@ from random import uniform
 from nns import *
 from misc import *
 from optimizer import *
+from cost_model import CostModel, Comb, Max
 
 def check_constraints(alg: NNS, v: float, alpha: float): 
     """ 
@@ -17,6 +18,31 @@ def check_constraints(alg: NNS, v: float, alpha: float):
     
     return True 
 
+def declare_rpc_constraints(model: CostModel, v, alpha): 
+    """ 
+    Declares the constraints of check_constraints (and of RPCOpt.constrs) for the alpha-RPC instantiation. 
+    """
+    model.constrain(v - alpha, 'v >= alpha')
+    model.constrain(model.w - alpha, 'w >= alpha')
+    model.constrain((model.n - model.w) - (v - alpha), '(n - w) >= (v - alpha)')
+
+def rpc_model(): 
+    """ 
+    Declarative cost model of the RPC algorithm, cf. RPC.runtime. 
+    """
+    m = CostModel('RPC', ['v', 'alpha'])
+    v, alpha = m.params
+    m.bound(alpha, 0, m.w)
+    declare_rpc_constraints(m, v, alpha)
+    declare_nns_terms(m, v, alpha)
+    N = m['list_size']
+    P = m.term('P', Comb(m.w, alpha) + Comb(m.n - m.w, v - alpha))
+    D = m['wedge_size']
+    F = Comb(m.n, v)
+    m.objective = m.term('runtime', N + P - D + Max(0, N + P - F))
+    m.memory = [N]
+    return m
+
 
 class RPC(NNS):
     """ 
@@ -24,6 +50,7 @@ class RPC(NNS):
     """
 
     _name = 'RPC'
+    _model = rpc_model()
 
     def runtime(self, v: float, alpha: float):
         if check_constraints(self, v, alpha) == False:
@@ -65,6 +92,13 @@ class RPCOpt(Optimizer):
             { 'type' : 'ineq',   'fun' : lambda args_opt : self._alg._w - args_opt[1]}, # w_NNS >= alpha
             { 'type' : 'ineq',   'fun' : lambda args_opt : (1 - self._alg._w) - (args_opt[0] - args_opt[1])}, #(1 - w_NNS) >= (v - alpha), s.t. second binomial in CapVol is defined 
         ]
+
+    @property
+    def substitutions(self):
+        return [
+            ('v = alpha', 1, lambda args_opt : args_opt[0]),
+            ('alpha = w', 1, lambda args_opt : self._alg._w),
+        ]
     
     @property
     def start(self, max_iter: int = 10000):
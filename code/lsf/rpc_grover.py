@@ -1,6 +1,8 @@
 from nns import *
 from misc import *
 from optimizer import *
+from cost_model import CostModel, Comb, Max
+from .rpc import declare_rpc_constraints
 
 def check_constraints(alg: NNS, v: float, alpha: float): 
     """ 
@@ -16,12 +18,37 @@ def check_constraints(alg: NNS, v: float, alpha: float):
     
     return True
 
+def declare_sieving_runtime(model: CostModel, v, alpha, time_bucket_search): 
+    """ 
+    Declares the runtime R + max(t_bucketing, t_checking) of RPC sieving with the given cost of searching one bucket, cf. RPC_Grover.runtime. 
+    """
+    P = model.term('P', Comb(model.w, alpha) + Comb(model.n - model.w, v - alpha))
+    R = model.term('R', P - model['wedge_size'])
+    t_bucketing = model.term('t_bucketing', model['list_size'])
+    t_checking = model.term('t_checking', model['num_buckets'] + time_bucket_search)
+    model.objective = model.term('runtime', R + Max(t_bucketing, t_checking))
+
+def rpc_grover_model(): 
+    """ 
+    Declarative cost model of the RPC + Grover algorithm, cf. RPC_Grover.runtime. 
+    """
+    m = CostModel('RPC_Grover', ['v', 'alpha'])
+    v, alpha = m.params
+    m.bound(alpha, 0, m.w)
+    declare_rpc_constraints(m, v, alpha)
+    declare_nns_terms(m, v, alpha)
+    size_bucket = m['bucket_size']
+    declare_sieving_runtime(m, v, alpha, m.term('time_bucket_search', Max(0, size_bucket, 2*size_bucket + m['prob']/2)))
+    m.memory = [m['list_size'], 0, size_bucket, 0]
+    return m
+
 class RPC_Grover(NNS):
     """ 
     Class that contains functions to calculate the runtime and the memory of RPC + Grover algorithm with optimized memory.
     """
 
     _name = 'RPC_Grover'
+    _model = rpc_grover_model()
 
     def time_bucket_search(self, v: float, alpha: float): 
         size_bucket = self.bucket_size(v, alpha)  
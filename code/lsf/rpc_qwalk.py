@@ -2,6 +2,9 @@ from random import uniform
 from nns import *
 from misc import *
 from optimizer import *
+from cost_model import CostModel, Comb, Max, Min
+from .rpc import declare_rpc_constraints
+from .rpc_grover import declare_sieving_runtime
 
 def check_constraints_qwalk(alg: NNS, v: float, alpha: float, vertex_size: float, v_beta: float, beta: float): 
     """ 
@@ -26,21 +29,64 @@ def check_constraints_qwalk(alg: NNS, v: float, alpha: float, vertex_size: float
     
     return True 
 
-# The following could be merged with the existing wedge_size inside the NNS class
-def wedge_size_LSF(n: float, w: float, v: float, alpha: float, weight_overlap: float = None, tol: float = 1e-10): 
-        """
-        Computes wedge quantities for the second layer of filtering. 
-        """  
-        if weight_overlap == None: 
-            t = w/2 
-        else:
-            t = weight_overlap 
-        def component_wedge_size(e):
-            return comb(t, e) + 2*comb(w - t, alpha - e) + comb(n - 2*w + t, v - 2*alpha + e)
-        def find_e(e):
-            return -max(0, component_wedge_size(e))
-        e=opt.fminbound(find_e, 0, min(t, alpha), xtol = tol, full_output = 1)
-        return e[0], component_wedge_size(e[0])
+def declare_qwalk_terms(model: CostModel): 
+    """ 
+    Declares the bounds, the constraints of check_constraints_qwalk and the beta-bucketing quantities shared by all QW variants. 
+    Returns the parameters (v, alpha, vertex_size, v_beta, beta) as used in the formulas. 
+    """
+    v, alpha, vertex_size, v_beta, beta = model.params
+    model.bound(alpha, 0, model.w)
+
+    # Constraints
+    declare_rpc_constraints(model, v, alpha)
+    declare_nns_terms(model, v, alpha)
+    model.constrain(model['bucket_size'] - vertex_size, 'bucket_size >= vertex_size')
+    model.constrain(v - v_beta, 'v >= v_beta')
+    model.constrain(v_beta - beta, 'v_beta >= beta')
+    model.constrain(alpha - beta, 'alpha >= beta')
+    model.constrain((v - alpha) - (v_beta - beta), 'v - alpha >= v_beta - beta')
+    model.constrain(- model['prob'] - 2*vertex_size, '1/p >= s^2')
+
+    # Quantities related to search in alpha-bucket and beta-bucketing 
+    model.term('num_sols_alpha_bucket', Max(0, 2*model['bucket_size'] + model['prob']))
+    beta_wedge = declare_wedge_size(v, alpha, v_beta, beta, weight_overlap = model['e_max'])
+    model.constrain(beta_wedge.hi - beta_wedge.lo, 'beta wedge range nonempty') # As for the wedge in declare_nns_terms
+    model.term('d_beta', Comb(alpha, beta) + Comb(v - alpha, v_beta - beta) - beta_wedge)
+    model.term('size_beta_bucket', vertex_size + Comb(alpha, beta) + Comb(v - alpha, v_beta - beta) - Comb(v, v_beta))
+    return v, alpha, vertex_size, v_beta, beta
+
+def declare_walk_parameters(model: CostModel, vertex_size, num_valid_beta_buckets, epsilon): 
+    """ 
+    Declares the parameters setup, update, check, delta and epsilon of the quantum walk. 
+    """
+    model.term('num_valid_beta_buckets', num_valid_beta_buckets)
+    model.term('delta', -vertex_size)
+    model.term('epsilon', epsilon)
+    model.term('setup', vertex_size + num_valid_beta_buckets)
+    model.term('check', 0)
+    model.term('update', Max(num_valid_beta_buckets, (num_valid_beta_buckets + model['size_beta_bucket'])/2))
+
+def qwalk_model(name: str, declare_time_bucket_search): 
+    """ 
+    Declarative cost model of a QW variant, where declare_time_bucket_search(model, v, alpha, vertex_size, v_beta, beta) declares the walk parameters and returns the cost of searching one alpha-bucket. 
+    """
+    m = CostModel(name, ['v', 'alpha', 'vertex_size', 'v_beta', 'beta'])
+    v, alpha, vertex_size, v_beta, beta = declare_qwalk_terms(m)
+    time_bucket_search = m.term('time_bucket_search', declare_time_bucket_search(m, v, alpha, vertex_size, v_beta, beta))
+    declare_sieving_runtime(m, v, alpha, time_bucket_search)
+    m_Q = vertex_size + m['num_valid_beta_buckets']
+    m.memory = [m['list_size'], m_Q, m['bucket_size'], m_Q]
+    return m
+
+def walk_cost(m: CostModel): 
+    """ 
+    Returns -epsilon/2 + max(update - delta/2, check), the cost of the walk after the setup. 
+    """
+    return -m['epsilon']/2 + Max(m['update'] - m['delta']/2, m['check'])
+
+def declare_qwalk_time_bucket_search(m: CostModel, v, alpha, vertex_size, v_beta, beta): 
+    declare_walk_parameters(m, vertex_size, m['d_beta'], Min(0, 2*vertex_size + m['prob']))
+    return m['num_sols_alpha_bucket'] + Max(m['setup'], walk_cost(m))
 
 
 class RPC_QuantumWalk(NNS):
@@ -49,6 +95,7 @@ class RPC_QuantumWalk(NNS):
     """
 
     _name = 'RPC_quantum_walk'  
+    _model = qwalk_model('RPC_quantum_walk', declare_qwalk_time_bucket_search)
     
     def time_bucket_search(self, v: float, alpha: float, vertex_size: float, v_beta: float, beta: float): 
         # Quantities related to search in alpha-bucket 
@@ -70,9 +117,6 @@ class RPC_QuantumWalk(NNS):
         return num_sols_alpha_bucket + max(setup, -epsilon/2 + max(update - delta/2, check))
 
     def runtime(self, v: float, alpha: float, vertex_size: float, v_beta: float, beta: float):
-        if isclose(v, alpha, abs_tol=1e-05): # Note that it currently doesn't update alpha in the main algorithm
-            alpha = v 
-
         if check_constraints_qwalk(self, v, alpha, vertex_size, v_beta, beta) == False:
             return 100
         
@@ -92,9 +136,6 @@ class RPC_QuantumWalk(NNS):
         return t
         
     def memory(self, v: float, alpha: float, vertex_size: float, v_beta: float, beta: float):
-        if isclose(v, alpha, abs_tol=1e-05): # Note that it currently doesn't update alpha in the main algorithm
-            alpha = v 
-            
         # Quantities related to beta-bucketing 
         e_max = self.wedge_size(v, alpha)[0] # e^* that maximizes the wedge size 
         num_valid_beta_buckets = comb(alpha, beta) + comb(v - alpha, v_beta - beta) - wedge_size_LSF(v, alpha, v_beta, beta, weight_overlap = e_max)[1]
@@ -137,6 +178,16 @@ class RPCOpt_QW(Optimizer):
             { 'type' : 'ineq',   'fun' : lambda args_opt : args_opt[0] - args_opt[1] - (args_opt[3] - args_opt[4])}, # v_ - alpha >= v_beta - beta
             { 'type' : 'ineq',   'fun' : lambda args_opt : - self._alg.prob(args_opt[0], args_opt[1]) - 2*args_opt[2]}, # s.t. 1/p >= s^2 
         ]
+
+    @property
+    def substitutions(self):
+        return [
+            ('v = alpha', 1, lambda args_opt : args_opt[0]),
+            ('alpha = beta', 4, lambda args_opt : args_opt[1]),
+            ('v_beta = beta', 3, lambda args_opt : args_opt[4]),
+            ('bucket_size = vertex_size', 2, lambda args_opt : self._alg.bucket_size(args_opt[0], args_opt[1])),
+            ('1/p = s^2', 2, lambda args_opt : - self._alg.prob(args_opt[0], args_opt[1])/2),
+        ]
     
     @property
     def start(self, max_iter: int = 10000):
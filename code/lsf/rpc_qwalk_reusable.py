@@ -2,7 +2,22 @@ from random import uniform
 from nns import *
 from misc import *
 from optimizer import *
-from .rpc_qwalk import check_constraints_qwalk, wedge_size_LSF 
+from cost_model import CostModel, Comb, Max, Switch
+from .rpc_qwalk import check_constraints_qwalk, wedge_size_LSF, qwalk_model, walk_cost
+from .rpc_qwalk_spars import declare_spars_time_bucket_search
+
+def declare_reusable_time_bucket_search(m: CostModel, v, alpha, vertex_size, v_beta, beta): 
+    declare_spars_time_bucket_search(m, v, alpha, vertex_size, v_beta, beta)
+    num_sols_alpha_bucket = m['num_sols_alpha_bucket']
+    num_sols_per_beta_RPC = m.term('num_sols_per_beta_RPC', Max(0, num_sols_alpha_bucket - m['d_beta']))
+    num_reps = m.term('num_reps', num_sols_alpha_bucket - num_sols_per_beta_RPC)
+
+    # Condition of check_constraint_reusable_walk: ncols <= size_codomain/4 
+    size_codomain = Comb(v, v_beta) - (Comb(alpha, beta) + Comb(v - alpha, v_beta - beta)) 
+    reusable = m.term('reusable_walk', size_codomain/4 - num_sols_per_beta_RPC)
+    return Switch(reusable, 
+                  num_reps + Max(m['setup'], num_sols_per_beta_RPC + walk_cost(m)), 
+                  num_reps + num_sols_per_beta_RPC + Max(m['setup'], walk_cost(m)))
 
 class RPC_QuantumWalk_Reusable(NNS):
     """ 
@@ -11,6 +26,7 @@ class RPC_QuantumWalk_Reusable(NNS):
     """
 
     _name = 'RPC_quantum_walk_reusable'    
+    _model = qwalk_model('RPC_quantum_walk_reusable', declare_reusable_time_bucket_search)
 
     def check_constraint_reusable_walk(self, v: float, alpha: float, v_beta: float, beta: float):              
         """
@@ -55,9 +71,6 @@ class RPC_QuantumWalk_Reusable(NNS):
             return num_reps + num_sols_per_beta_RPC + max(setup, -epsilon/2 + max(update - delta/2, check))
     
     def runtime(self, v: float, alpha: float, vertex_size: float, v_beta: float, beta: float):
-        if isclose(v, alpha, abs_tol=1e-05): # Note that it currently doesn't update alpha in the main algorithm
-            alpha = v 
-
         if check_constraints_qwalk(self, v, alpha, vertex_size, v_beta, beta) == False:
             return 100
         
@@ -77,9 +90,6 @@ class RPC_QuantumWalk_Reusable(NNS):
         return t
         
     def memory(self, v: float, alpha: float, vertex_size: float, v_beta: float, beta: float):
-        if isclose(v, alpha, abs_tol=1e-05): # Note that it currently doesn't update alpha in the main algorithm
-            alpha = v 
-            
         m_C = list_size(self._n, self._w)
         m_Q = vertex_size # num_valid_beta_buckets = 0 
         m_QRACM = self.bucket_size(v, alpha)
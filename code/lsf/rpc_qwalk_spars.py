@@ -2,7 +2,13 @@ from random import uniform
 from nns import *
 from misc import *
 from optimizer import *
-from .rpc_qwalk import check_constraints_qwalk, wedge_size_LSF
+from cost_model import CostModel, Max, Min
+from .rpc_qwalk import check_constraints_qwalk, wedge_size_LSF, declare_walk_parameters, qwalk_model, walk_cost
+
+def declare_spars_time_bucket_search(m: CostModel, v, alpha, vertex_size, v_beta, beta): 
+    d_beta = m['d_beta']
+    declare_walk_parameters(m, vertex_size, 0, Min(- d_beta, 2*vertex_size + m['prob'] - d_beta))
+    return m['num_sols_alpha_bucket'] + Max(m['setup'], walk_cost(m))
 
 class RPC_QuantumWalk_Sparsification(NNS):
     """ 
@@ -10,6 +16,7 @@ class RPC_QuantumWalk_Sparsification(NNS):
     """
 
     _name = 'RPC_quantum_walk_sparsification'  
+    _model = qwalk_model('RPC_quantum_walk_sparsification', declare_spars_time_bucket_search)
 
     def time_bucket_search(self, v: float, alpha: float, vertex_size: float, v_beta: float, beta: float): 
         # Quantities related to search in alpha-bucket 
@@ -31,9 +38,6 @@ class RPC_QuantumWalk_Sparsification(NNS):
         return num_sols_alpha_bucket + max(setup, -epsilon/2 + max(update - delta/2, check))
 
     def runtime(self, v: float, alpha: float, vertex_size: float, v_beta: float, beta: float):
-        if isclose(v, alpha, abs_tol=1e-05): # Note that it currently doesn't update alpha in the main algorithm
-            alpha = v 
-
         if check_constraints_qwalk(self, v, alpha, vertex_size, v_beta, beta) == False:
             return 100
         
@@ -53,9 +57,6 @@ class RPC_QuantumWalk_Sparsification(NNS):
         return t
         
     def memory(self, v: float, alpha: float, vertex_size: float, v_beta: float, beta: float):
-        if isclose(v, alpha, abs_tol=1e-05): # Note that it currently doesn't update alpha in the main algorithm
-            alpha = v 
-
         m_C = list_size(self._n, self._w)
         m_Q = vertex_size # num_beta_buckets = 0 
         m_QRACM = self.bucket_size(v, alpha)
@@ -64,63 +64,105 @@ def read_results(dir: str, filename: str):
             res.append(row_float)
     return res
 
-def time_memory(alg, optimizer = None, range_weights = 100, iters = 50, prec = 1e-7, min_val = 1000, max_iter = 2000): 
+def results_filename(alg_name: str, range_weights: int, iters: int, prec: float, min_val: float = 1000, max_iter: int = 2000, smooth: bool = False, active_set: bool = False): 
+    """ 
+    Name of the file (without extension) in which the results of time_memory are stored. 
+    Settings other than the defaults of time_memory are appended, so that the results of different optimizers are not mixed in one file (see lookup.sweep_files). 
+    """
+    name = alg_name + '_w' + str(range_weights) + '_i' + str(iters) + '_p' + str(prec)
+    if min_val != 1000: 
+        name += '_m' + '%g' % min_val
+    if max_iter != 2000: 
+        name += '_x' + str(int(max_iter))
+    if smooth: 
+        name += '_smooth'
+    if active_set: 
+        name += '_active_set'
+    return name
+
+def sweep_weights(range_weights = 100, smooth = False): 
+    """ 
+    Weights w for which time_memory computes the optimum: writing r=range_weights, w ranges over [1/r, 1/2) in steps of 1/r. 
+    """
+    weights = []
+    for i in range(1, int(range_weights/2)):  
+        w = i/range_weights
+        if w >= 0.49 and not smooth: # LE: Only until <0.49, because QW version seems to have issues with 49. TODO: Resolve (the smooth reformulation does not have this issue) 
+            continue 
+        weights.append(w)
+    return weights
+
+def time_memory_weight(alg, optimizer, w, iters = 50, prec = 1e-7, min_val = 1000, max_iter = 2000, smooth = False, active_set = False): 
+    """
+    Returns [w, t, m, params] for weight w, where t is the optimum time found in given iterations for given precision, m the corresponding memory and params the optimal parameters. 
+    If active_set is 'True', the parameters are optimized with Optimizer.optimize_active_set instead (with its own number of iterations). 
+    """
+    alg._n = 1
+    alg._w = w
+    if alg._name == 'GJN':
+        t = alg.runtime()
+        m = alg.memory()
+        return [w, t, m, []]
+
+    if active_set: 
+        v, alpha, *args = optimizer.optimize_active_set(prec = prec, min_val = min_val, max_iter = max_iter)
+    else: 
+        v, alpha, *args = optimizer.optimize(iters, prec, min_val, max_iter, smooth = smooth)
+    t = alg.runtime(v, alpha, *args)
+    m = alg.memory(v, alpha, *args)
+
+    if alg._name == 'RPC_quantum_walk_reusable': 
+        v, alpha, s, v_beta, beta = v, alpha, *args
+        if alg.check_constraint_reusable_walk(v, alpha, v_beta, beta) == True: # Check if reusable is applied
+            print("Reusable walk applied")
+    return [w, t, m, [v, alpha, *args]]
+
+def time_memory(alg, optimizer = None, range_weights = 100, iters = 50, prec = 1e-7, min_val = 1000, max_iter = 2000, smooth = False, active_set = False): 
     """
     Construct list containing all [w, t] for different w, where t is the optimum time found in given iterations for given precision. 
     Writing r=range_weights, w ranges over [1/r, 1/2) in steps of 1/r. 
+    If smooth is 'True', the smooth epigraph reformulation is optimized instead, where iters is the number of starting points per branch. 
+    If active_set is 'True', the parameters are optimized in the space that remains when the active constraints are eliminated, where the active set of one weight is the hypothesis for the next (see Optimizer.optimize_active_set). 
     """
 
     res = []
-    for i in range(1, int(range_weights/2)):  
-        print("i: ", i)
-        w = i/range_weights
-        if w >= 0.49: # LE: Only until <0.49, because QW version seems to have issues with 49. TODO: Resolve 
-            continue 
-        alg._n = 1
-        alg._w = w
-        if alg._name == 'GJN':
-            t = alg.runtime()
-            m = alg.memory()
-        else:
-            v, alpha, *args = optimizer.optimize(iters, prec, min_val, max_iter)
-            t = alg.runtime(v, alpha, *args)
-            m = alg.memory(v, alpha, *args)
-        res.append([w, t, m, [v, alpha, *args]])
- 
-        if alg._name == 'RPC_quantum_walk_reusable': 
-            v, alpha, s, v_beta, beta = v, alpha, *args
-            if alg.check_constraint_reusable_walk(v, alpha, v_beta, beta) == True: # Check if reusable is applied
-                print("Reusable walk applied")
+    for w in sweep_weights(range_weights, smooth):  
+        print("w: ", w)
+        res.append(time_memory_weight(alg, optimizer, w, iters, prec, min_val, max_iter, smooth, active_set))
     return res
     
 ##########################################################################
 #--------------------------- DRIVER CODE --------------------------------#
 ##########################################################################
-plots_dir = '../plots/'
-data_dir = '../data/'
+if __name__ == '__main__':
+    plots_dir = '../plots/'
+    data_dir = '../data/'
+
+    range_weights = 100
+    iters = 20
+    prec = 1e-10
+    smooth = False # If True, optimize the smooth epigraph reformulation (iters starting points per branch, few of them may miss the optimum)
+    active_set = False # If True, optimize in the space that remains when the active constraints are eliminated
 
-range_weights = 100
-iters = 20
-prec = 1e-10
+    # Worst-case complexity
+    max_t_in_L = lambda L : max(L, key=lambda x: x[1])[1]
 
-# Worst-case complexity
-max_t_in_L = lambda L : max(L, key=lambda x: x[1])[1]
+    # Algorithms
+    alg_names = ['RPC', 'RPC_Grover', 'RPC_quantum_walk', 'RPC_quantum_walk_sparsification']
+    #alg_names = ['RPC', 'RPC_Grover', 'RPC_quantum_walk', 'RPC_quantum_walk_sparsification', 'RPC_quantum_walk_reusable']
 
-# Algorithms
-alg_names = ['RPC', 'RPC_Grover', 'RPC_quantum_walk', 'RPC_quantum_walk_sparsification']
-#alg_names = ['RPC', 'RPC_Grover', 'RPC_quantum_walk', 'RPC_quantum_walk_sparsification', 'RPC_quantum_walk_reusable']
+    result = []
+    for alg_name in alg_names:
+        alg, optimizer, alg_label = alg_choice(alg_name)
+        L = time_memory(alg, optimizer, range_weights, iters, prec, smooth = smooth, active_set = active_set)
+        write_results(L, data_dir, results_filename(alg_name, range_weights, iters, prec, smooth = smooth, active_set = active_set))
+        print(alg_name, "worst-case complexity :", max_t_in_L(L))
+        result.append([L, alg_label])
 
-result = []
-for alg_name in alg_names:
-    alg, optimizer, alg_label = alg_choice(alg_name)
-    L = time_memory(alg, optimizer, range_weights, iters, prec)
-    write_results(L, data_dir, alg_name + '_w' + str(range_weights) + '_i' + str(iters) + '_p' + str(prec))
-    print(alg_name, "worst-case complexity :", max_t_in_L(L))
-    result.append([L, alg_label])
+    # Plot
+    plot_times(result, plots_dir, 'NNS' + '_w' + str(range_weights) + '_i' + str(iters) + '_p' + str(prec))
 
-# Plot
-plot_times(result, plots_dir, 'NNS' + '_w' + str(range_weights) + '_i' + str(iters) + '_p' + str(prec))
+    print('----------------------------')
 
 ##########################################################################
 ##########################################################################
-print('----------------------------')
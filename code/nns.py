@@ -3,6 +3,50 @@ import matplotlib.pyplot as plt
 import os
 import scipy.optimize as opt
 from misc import *
+from cost_model import CostModel, Comb, Max, Min, Maximize, Sym
+
+def wedge_size_LSF(n: float, w: float, v: float, alpha: float, weight_overlap: float = None, tol: float = 1e-10): 
+    """
+    Returns e and the log_2 size of the wedge in S_v^n defined by vectors x,y of weight w such that |x \land y| = weight_overlap, where e is the dominating contributor to the wedge size.
+    Also used for the second layer of filtering (with n, w, v, alpha replaced by v, alpha, v_beta, beta). 
+    """  
+    if weight_overlap == None: 
+        t = w/2 
+    else:
+        t = weight_overlap 
+    def component_wedge_size(e):
+        return comb(t, e) + 2*comb(w - t, alpha - e) + comb(n - 2*w + t, v - 2*alpha + e)
+    def find_e(e):
+        return -max(0, component_wedge_size(e))
+    # Search where all binomials are defined (as in declare_wedge_size), e.g. for v = alpha this is only e = alpha 
+    e_min, e_max = max(0, alpha - (w - t), 2*alpha - v), min(t, alpha, (n - 2*w + t) - (v - 2*alpha))
+    if e_min > e_max: 
+        e_min, e_max = 0, min(t, alpha)
+    e=opt.fminbound(find_e, e_min, e_max, xtol = tol, full_output = 1)
+    return e[0], component_wedge_size(e[0])
+
+def declare_wedge_size(n, w, v, alpha, weight_overlap = None): 
+    """
+    Declarative counterpart of wedge_size_LSF. The returned expression is the log_2 size of the wedge, its attribute argmax is the dominating e. 
+    Here e ranges over the values for which all binomials are defined, on which the component is concave. 
+    """
+    t = w/2 if weight_overlap is None else weight_overlap 
+    e = Sym('e')
+    component_wedge_size = Comb(t, e) + 2*Comb(w - t, alpha - e) + Comb(n - 2*w + t, v - 2*alpha + e)
+    return Maximize(component_wedge_size, e, Max(0, alpha - (w - t), 2*alpha - v), Min(t, alpha, (n - 2*w + t) - (v - 2*alpha)))
+
+def declare_nns_terms(model: CostModel, v, alpha): 
+    """
+    Declares the NNS quantities (as in the NNS class below) as named terms of model, for the alpha-RPC with parameters v and alpha. 
+    """
+    n, w = model.n, model.w
+    model.term('list_size', Comb(n, w) - Comb(w, w/2) - Comb(n - w, w/2))
+    model.term('num_buckets', Comb(n, v) - Comb(w, alpha) - Comb(n - w, v - alpha))
+    model.term('bucket_size', model['list_size'] + Comb(v, alpha) + Comb(n - v, w - alpha) - Comb(n, w))
+    wedge = model.term('wedge_size', declare_wedge_size(n, w, v, alpha))
+    model.term('e_max', wedge.argmax)
+    model.constrain(wedge.hi - wedge.lo, 'wedge range nonempty') # Otherwise the search is at lo, where the penalty of misc.h gives a finite runtime
+    model.term('prob', Comb(w, w/2) + Comb(n - w, w/2) - Comb(v, alpha) - Comb(n - v, w - alpha) - Comb(w, alpha) - Comb(n - w, v - alpha) + wedge)
 
 class NNS(ABC):
     """ 
@@ -10,6 +54,7 @@ class NNS(ABC):
     """
 
     _name = 'NNS'
+    _model = None # Declarative CostModel of the variant, if available
 
     def __init__(self, n: float = 1, w: float = 0.5):
         self._n = n
@@ -31,16 +76,7 @@ class NNS(ABC):
         """
         Returns e and the log_2 size of the wedge in S_v^n defined by vectors x,y of weight w such that |x \land y| = weight_overlap, where e is the dominating contributor to the wedge size.
         """  
-        if weight_overlap == None: 
-            t = self._w/2 
-        else:
-            t = weight_overlap 
-        def component_wedge_size(e):
-            return comb(t, e) + 2*comb(self._w - t, alpha - e) + comb(self._n - 2*self._w + t, v - 2*alpha + e)
-        def find_e(e):
-            return -max(0, component_wedge_size(e))
-        e=opt.fminbound(find_e, 0, min(t, alpha), xtol = tol, full_output = 1)
-        return e[0], component_wedge_size(e[0])
+        return wedge_size_LSF(self._n, self._w, v, alpha, weight_overlap, tol)
 
     def prob(self, v: float, alpha: float):   
         """
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod 
+import numpy as np
 import scipy.optimize as opt
+from cost_model import CostModel
 
 def validity(constrs, args, tol: float = 1e-7):
     """ 
@@ -39,16 +41,30 @@ class Optimizer(ABC):
     def start(self):
         ...
 
-    def optimize(self, iters: int = 100, prec: float = 1e-10, min_val: int = 1000, max_iter: int = 2000):
+    def optimize(self, iters: int = 100, prec: float = 1e-10, min_val: int = 1000, max_iter: int = 2000, compiled: bool = False, smooth: bool = False, start = None):
         """ 
         Optimizes parameters params of function opt_func in given number of iterations iter and for a given precision prec.
+        If compiled is 'True', the compiled cost model of the algorithm is used instead (runtime with gradient and vector-valued constraints).
+        If smooth is 'True', the smooth epigraph reformulation of the cost model is optimized, see optimize_smooth. 
+        If start is given (e.g. the argmin of a landscape, see landscape.py), the first iteration starts from it instead of a random starting point. 
         """
+        if smooth: 
+            return self.optimize_smooth(iters, prec, min_val, max_iter)
+        if compiled: 
+            model = self._alg._model.compile()
+            fun = lambda x : model.runtime(x, self._alg._n, self._alg._w)
+            jac = lambda x : model.gradient(x, self._alg._n, self._alg._w)
+            constrs = model.scipy_constraints(self._alg._n, self._alg._w)
+        else: 
+            fun, jac, constrs = self.opt_func, None, self.constrs
+
         i = 0
         while i < iters:
-            result = opt.minimize(self.opt_func, 
-                                self.start, 
+            result = opt.minimize(fun, 
+                                start if (i == 0 and start is not None) else self.start, 
+                                jac = jac,
                                 bounds = self.bounds,
-                                constraints = self.constrs,
+                                constraints = constrs,
                                 tol = prec, 
                                 options = {'maxiter':max_iter})
             opt_val = result.get('fun')
@@ -57,4 +73,143 @@ class Optimizer(ABC):
                 result_min = result 
             i += 1
         
-        return result_min.x
\ No newline at end of file
+        return result_min.x
+
+    @property
+    def substitutions(self): 
+        """ 
+        Constraints that can be active at an optimum, as a list of (label, i, fun) such that the constraint is tight iff args[i] = fun(args). 
+        Here fun may only depend on parameters that come before in the list or that are not eliminated by any substitution. 
+        """
+        return []
+
+    def active_set(self, args, tol: float = 1e-5): 
+        """ 
+        Labels of the substitutions whose constraints are tight at args up to tol (at most one per parameter). 
+        """
+        active, eliminated = [], set()
+        for label, i, fun in self.substitutions: 
+            if i not in eliminated and abs(args[i] - fun(args)) <= tol: 
+                active.append(label)
+                eliminated.add(i)
+        return active
+
+    def reduce(self, active: list): 
+        """ 
+        Returns the indices of the remaining parameters and the function that expands the remaining parameters to all parameters, when the constraints in active are tight. 
+        """
+        substitutions = [(i, fun) for label, i, fun in self.substitutions if label in active]
+        free = [i for i in range(len(self.bounds)) if i not in {i for i, _ in substitutions}]
+        def expand(args_reduced): 
+            args = np.zeros(len(self.bounds))
+            args[free] = args_reduced
+            for i, fun in substitutions: 
+                args[i] = fun(args)
+            return args
+        return free, expand
+
+    def minimize_from(self, starts, active: list = [], prec: float = 1e-10, min_val: int = 1000, max_iter: int = 2000): 
+        """ 
+        Minimizes opt_func from every point in starts, in the space of the parameters that remain when the constraints in active are tight. 
+        Returns the best parameters (all of them) that satisfy the constraints and their runtime, or (None, min_val). 
+        Results with the penalty runtime are rejected: validity allows violations up to prec, but the runtime() functions check the constraints strictly. 
+        """
+        min_val = min(min_val, CostModel.penalty)
+        free, expand = self.reduce(active)
+        bounds = [self.bounds[i] for i in free]
+        constrs = [{'type' : constr['type'], 'fun' : lambda args_reduced, f = constr['fun'] : f(expand(args_reduced))} for constr in self.constrs]
+        result_min = None 
+        for start in starts: 
+            result = opt.minimize(lambda args_reduced : self.opt_func(expand(args_reduced)), 
+                                np.clip(np.asarray(start, dtype = float)[free], [lo for lo, _ in bounds], [hi for _, hi in bounds]), 
+                                bounds = bounds,
+                                constraints = constrs,
+                                tol = prec, 
+                                options = {'maxiter':max_iter})
+            args = expand(result.x)
+            opt_val = self.opt_func(args)
+            if (result.success and opt_val < min_val and validity(self.constrs, args, tol = prec)):
+                min_val = opt_val 
+                result_min = args 
+        return result_min, min_val
+
+    def optimize_active_set(self, iters: int = 10, prec: float = 1e-10, min_val: int = 1000, max_iter: int = 2000, tol: float = 1e-5): 
+        """ 
+        Optimizes the parameters in the space that remains when the constraints of an active set are tight (see substitutions), from iters starting points and the optimum of the previous call. 
+        The active set of the previous call is used as hypothesis. It is checked by polishing the reduced optimum and the previous optimum in the full space; 
+        if that improves the runtime, the active set is detected at the polished optimum, onto which the optimum is then moved by a solve in the reduced space. 
+        The active set and the optimum are kept for the next call, e.g. for the next weight. 
+        If no valid optimum is found, not even from new starting points in the full space, the result of optimize is returned. 
+        There is no real speedup: for RPC_quantum_walk on w = 0.01, ..., 0.11, iters = 10 takes about 80% of the time of optimize(20) and gives optima up to 5e-5 worse at some weights 
+        (and better at others). Most of the time goes into the starting points in the reduced space, not into the polish in the full space, so skipping the polish saves little; 
+        fewer starting points (iters = 5 takes about 45% of the time) give optima up to 2e-4 worse. 
+        """
+        previous = getattr(self, '_previous', None)
+        active = getattr(self, '_active', [])
+        starts = [self.start for _ in range(iters)]
+        if previous is not None: 
+            starts.insert(0, previous)
+        args_min, min_val = self.minimize_from(starts, active, prec, min_val, max_iter)
+        rounds = 0 
+        while args_min is None and rounds < 10: # No valid optimum in the reduced space, then new starting points in the full space
+            args_min, min_val = self.minimize_from([self.start for _ in range(iters)], [], prec, min_val, max_iter)
+            rounds += 1
+        if args_min is None: # Still none, then the default optimizer (the hypothesis is kept for the next call)
+            return self.optimize(iters, prec, min_val, max_iter)
+
+        args, val = self.minimize_from([args for args in [args_min, previous] if args is not None], [], prec, min_val - prec, max_iter)
+        if args is not None: 
+            args_min, min_val = args, val 
+            active = self.active_set(args_min, tol)
+            args, val = self.minimize_from([args_min], active, prec, min_val + prec, max_iter)
+            if args is not None: 
+                args_min, min_val = args, val 
+
+        self._active, self._previous = active, args_min 
+        return args_min
+
+    def optimize_smooth(self, iters: int = 2, prec: float = 1e-10, min_val: int = 1000, max_iter: int = 2000, max_rounds: int = 10): 
+        """ 
+        Optimizes the smooth epigraph reformulation of the cost model of the algorithm (see cost_model.epigraph), where every branch is optimized independently from iters starting points. 
+        Returns the parameters of the best result that satisfies the constraints of the original model with a runtime below the penalty. 
+        Results are judged by the original model only, as SLSQP often stops at its iteration limit on a feasible point (e.g. RPC_Grover at w = 0.47). 
+        If no start of a round gives such a result, the starting points are drawn again, for at most max_rounds rounds, before falling back to optimize. 
+        """
+        n, w = self._alg._n, self._alg._w
+        model = self._alg._model.compile()
+        branches = [branch.compile() for branch in self._alg._model.smooth_branches()]
+        min_val = min(min_val, CostModel.penalty)
+        result_min = None
+        rounds = 0
+        while result_min is None and rounds < max_rounds:
+            for smooth in branches: 
+                constrs = smooth.scipy_constraints(n, w)
+                i = 0
+                while i < iters:
+                    result = opt.minimize(lambda x : smooth.runtime(x, n, w), 
+                                        smooth.complete(self.compiled_start(model, n, w), n, w), 
+                                        jac = lambda x : smooth.gradient(x, n, w),
+                                        bounds = smooth.bounds(n, w),
+                                        constraints = constrs,
+                                        tol = prec, 
+                                        options = {'maxiter':max_iter})
+                    x = result.x[:model.dim]
+                    opt_val = self.opt_func(x)
+                    if (opt_val < min_val and model.feasible(x, n, w)):
+                        min_val = opt_val 
+                        result_min = x 
+                    i += 1
+            rounds += 1
+
+        if result_min is None: 
+            return self.optimize(iters, prec, min_val, max_iter)
+        return result_min
+
+    def compiled_start(self, model, n: float, w: float, samples: int = 10000, max_val: float = 0.009): 
+        """ 
+        Starting point drawn as in start, but from a batch of samples evaluated at once with the compiled model. 
+        If no sample satisfies the constraints, the sample with the least violation is returned (e.g. for weights close to 1/2). 
+        """
+        X = np.random.uniform(0, max_val, (samples, model.dim))
+        violation = np.sum(np.minimum(model.constraints(X, n, w), 0)**2, axis=-1)
+        return X[np.argmin(violation)]
@@ -0,0 +1,146 @@
+import argparse
+from math import pi
+import numpy as np
+from lookup import OptimumIndex
+from lsf.rpc_qwalk import RPC_QuantumWalk
+from lsf.rpc_qwalk_spars import RPC_QuantumWalk_Sparsification
+from lsf.rpc_qwalk_reusable import RPC_QuantumWalk_Reusable
+
+##########################################################################
+#------------------------------ CONSTANTS -------------------------------#
+##########################################################################
+
+# The asymptotic exponents of the QW variants drop the constants of the quantum subroutines, which are made explicit here:
+# 'grover'            Grover iterations per sqrt(N/M) to find one of M marked elements among N, cf. [BBHT98]
+# 'amplification'     iterations of the amplitude amplification of the walk per 1/sqrt(epsilon), cf. [MNRS11]
+# 'phase_estimation'  walk steps of the reflection about the stationary distribution per 1/sqrt(delta), cf. [MNRS11]
+CONSTANTS = {'grover': pi/4, 'amplification': pi/4, 'phase_estimation': 1.}
+
+QW_VARIANTS = {alg._name: alg for alg in [RPC_QuantumWalk, RPC_QuantumWalk_Sparsification, RPC_QuantumWalk_Reusable]}
+
+##########################################################################
+#--------------------------- LOG_2 ARITHMETIC ---------------------------#
+##########################################################################
+
+def log2_ceil(x, c: float = 1.):
+    """
+    Log_2 of ceil(c*2^x) on arrays, where the rounding only matters (and is only applied) for small counts.
+    """
+    x = np.asarray(x, dtype=float) + np.log2(c)
+    return np.where(x < 52, np.log2(np.ceil(np.exp2(np.minimum(x, 52)))), x)
+
+def log2_add(*args):
+    """
+    Log_2 of the sum of 2^x for x in args, on arrays.
+    """
+    res = args[0]
+    for x in args[1:]:
+        res = np.logaddexp2(res, x)
+    return res
+
+##########################################################################
+#-------------------------- RESOURCE ESTIMATION -------------------------#
+##########################################################################
+
+def concrete_params(P, n: int):
+    """
+    Concrete parameters at length n of the relative parameters P (array of shape (..., 5) of [v, alpha, vertex_size, v_beta, beta]), where the weights are rounded
+    and vertex_size becomes the log_2 size n*vertex_size of the vertex.
+    """
+    X = np.round(np.asarray(P, dtype=float)*n)
+    X[..., 2] = np.asarray(P, dtype=float)[..., 2]*n
+    return X
+
+def walk_resources(alg_name: str, n: int, w: int, P, relative: bool = True, constants: dict = CONSTANTS):
+    """
+    Concrete resources of the QW variant alg_name at length n and weight w (w even) for the parameter sets P (array of shape (..., 5) of [v, alpha, vertex_size, v_beta, beta],
+    relative as returned by the optimizers, or concrete as in concrete_params if relative is 'False').
+    The phases of the walk are evaluated with the terms of the cost model of the variant with exact binomial coefficients, and with the constants of the quantum subroutines.
+
+    Per alpha-bucket, a walk is run for every solution (a setup and a walk), except for the reusable walk, which, iff the condition of check_constraint_reusable_walk holds,
+    only sets up once per num_reps and then walks num_sols_per_beta_RPC times. One walk makes ceil(a/sqrt(epsilon)) iterations of amplitude amplification, each with
+    ceil(b/sqrt(delta)) walk steps and one check. The setup loads the vertex from the alpha-bucket in QRACM and writes the vertex and its beta-buckets in QRAQM.
+    An update step loads one element from QRACM, rewrites the beta-buckets (2^num_valid_beta_buckets QRAQM queries) and searches the beta-bucket of the new element
+    with Grover (one QRAQM query per iteration).
+
+    Returns a dictionary of arrays of shape P.shape[:-1] with the log_2 of the (expected) counts:
+        'repetitions', 'buckets', 'setups' and 'walks' (per alpha-bucket), 'iterations', 'steps_per_iteration', 'steps' (per walk) and 'step_grover' (per update step),
+    and, over the whole algorithm, per phase:
+        'bucketing' (classical operations), 'setup_qracm', 'setup_qraqm', 'walk_steps', 'update_qracm', 'update_qraqm', 'update_grover', 'check_qraqm',
+    the totals 'qracm', 'qraqm', 'grover' and 'total' (classical operations and queries), and 'exponent', the runtime formula of the model with exact binomials.
+    'reusable' is 'True' where the reusable walk applies and 'feasible' where the concrete parameters satisfy the constraints.
+    """
+    if alg_name not in QW_VARIANTS:
+        raise ValueError('No walk resources for ' + alg_name + '.')
+    model = QW_VARIANTS[alg_name]._model.compile()
+    X = concrete_params(P, n) if relative else np.asarray(P, dtype=float)
+    T = model.terms(X, n, w, exact = True)
+    res = {}
+
+    # Walks per alpha-bucket
+    if 'reusable_walk' in T:
+        reusable = T['reusable_walk'] >= 0
+        res['setups'] = np.where(reusable, T['num_reps'], T['num_reps'] + T['num_sols_per_beta_RPC'])
+        res['walks'] = T['num_reps'] + T['num_sols_per_beta_RPC']
+    else:
+        reusable = np.zeros(X.shape[:-1], dtype=bool)
+        res['setups'] = res['walks'] = T['num_sols_alpha_bucket']
+    res['repetitions'], res['buckets'] = T['R'], T['num_buckets']
+
+    # One walk
+    res['iterations'] = log2_ceil(-T['epsilon']/2, constants['amplification'])
+    res['steps_per_iteration'] = log2_ceil(-T['delta']/2, constants['phase_estimation'])
+    res['steps'] = res['iterations'] + res['steps_per_iteration']
+    res['step_grover'] = log2_ceil((T['num_valid_beta_buckets'] + T['size_beta_bucket'])/2, constants['grover'])
+
+    # Whole algorithm
+    per_bucket = T['R'] + T['num_buckets']
+    setups, walk_steps = per_bucket + res['setups'], per_bucket + res['walks'] + res['steps']
+    res['bucketing'] = T['R'] + T['t_bucketing']
+    res['setup_qracm'] = setups + X[..., 2]
+    res['setup_qraqm'] = setups + T['setup']
+    res['walk_steps'] = walk_steps
+    res['update_qracm'] = walk_steps
+    res['update_qraqm'] = walk_steps + log2_add(T['num_valid_beta_buckets'], res['step_grover'])
+    res['update_grover'] = walk_steps + res['step_grover']
+    res['check_qraqm'] = per_bucket + res['walks'] + res['iterations'] + T['check']
+    res['qracm'] = log2_add(res['setup_qracm'], res['update_qracm'])
+    res['qraqm'] = log2_add(res['setup_qraqm'], res['update_qraqm'], res['check_qraqm'])
+    res['grover'] = res['update_grover']
+    res['total'] = log2_add(res['bucketing'], res['qracm'], res['qraqm'])
+    res['exponent'] = T['runtime']
+    res['reusable'] = reusable
+    res['feasible'] = model.feasible(X, n, w, exact = True)
+    return res
+
+def tabulate(alg_name: str, n: int, W, P, **kwargs):
+    """
+    walk_resources at length n for the relative weights W (w = W*n rounded to an even weight) with the relative parameters P (one row per weight).
+    """
+    W = 2*np.round(np.asarray(W, dtype=float)*n/2)
+    P = np.asarray(P, dtype=float)
+    # One call per distinct weight, the parameter sets of a weight are evaluated in one batch
+    res = {}
+    for w in np.unique(W):
+        rows = W == w
+        for key, values in walk_resources(alg_name, n, w, P[rows], **kwargs).items():
+            res.setdefault(key, np.empty(len(W), dtype = values.dtype))[rows] = values
+    return res
+
+##########################################################################
+#--------------------------- DRIVER CODE --------------------------------#
+##########################################################################
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Concrete resources of the QW variants at finite length for the optimal parameters of a sweep.')
+    parser.add_argument('--alg', default = 'RPC_quantum_walk', choices = list(QW_VARIANTS))
+    parser.add_argument('--n', type = int, default = 1000)
+    parser.add_argument('--data_dir', default = '../data/')
+    parser.add_argument('--file', default = None, help = 'results of time_memory, by default those with the finest range of weights')
+    args = parser.parse_args()
+
+    index = OptimumIndex.load(args.data_dir, args.alg, args.file)
+    res = tabulate(args.alg, args.n, index.W, index.P)
+    keys = ['exponent', 'total', 'bucketing', 'qracm', 'qraqm', 'grover', 'walk_steps']
+    print('w', *keys, 'reusable', 'feasible')
+    for i, w in enumerate(index.W):
+        print('%.4f' % w, *['%.2f' % res[key][i] for key in keys], res['reusable'][i], res['feasible'][i])
@@ -0,0 +1,213 @@
+import argparse
+import multiprocessing as mp
+import os
+from math import lgamma, log
+import numpy as np
+from misc import comb
+from lsf.rpc import RPC
+
+##########################################################################
+#--------------------------- BIT-PACKED VECTORS -------------------------#
+##########################################################################
+
+# Vectors of length n are stored bit-packed as rows of ceil(n/64) uint64 words, so that the weight of x AND c or x XOR y is a popcount of a few words.
+
+if hasattr(np, 'bitwise_count'): # NumPy >= 2.0
+    def popcount(X):
+        """
+        Hamming weights of the rows of the bit-packed array X.
+        """
+        return np.bitwise_count(X).sum(axis=-1, dtype=np.int64)
+else:
+    _byte_weights = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+    def popcount(X):
+        """
+        Hamming weights of the rows of the bit-packed array X.
+        """
+        return _byte_weights[np.ascontiguousarray(X).view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+def pack(B):
+    """
+    Bit-packs the boolean array B of shape (num, n) into an uint64 array of shape (num, ceil(n/64)).
+    """
+    num, n = B.shape
+    words = -(-n//64)
+    P = np.packbits(B, axis=1, bitorder='little')
+    P = np.pad(P, ((0, 0), (0, 8*words - P.shape[1])))
+    return P.view('<u8')
+
+def random_supports(rng, num: int, n: int, k: int):
+    """
+    Supports of num uniformly random vectors of weight k, as the first k positions of random permutations (array of shape (num, n)).
+    """
+    return np.argsort(rng.random((num, n)), axis=1)
+
+def random_vectors(rng, num: int, n: int, k: int):
+    """
+    num uniformly random bit-packed vectors of length n and weight k.
+    """
+    B = np.zeros((num, n), dtype=bool)
+    np.put_along_axis(B, random_supports(rng, num, n, k)[:, :k], True, axis=1)
+    return pack(B)
+
+def random_solution_pairs(rng, num: int, n: int, w: int):
+    """
+    num uniformly random pairs of bit-packed vectors x, y of length n and weight w with |x + y| = w, i.e. |x AND y| = w/2.
+    """
+    perm = random_supports(rng, num, n, w)
+    X, Y = np.zeros((num, n), dtype=bool), np.zeros((num, n), dtype=bool)
+    np.put_along_axis(X, perm[:, :w], True, axis=1)
+    np.put_along_axis(Y, np.concatenate([perm[:, :w//2], perm[:, w:w + w//2]], axis=1), True, axis=1)
+    return pack(X), pack(Y)
+
+##########################################################################
+#---------------------------- SIMULATIONS -------------------------------#
+##########################################################################
+
+# Every simulation is split into chunks that are generated from their own seed, so that they can be computed in any order, by any process, without storing the list.
+# A chunk returns counts, which are summed over all chunks.
+
+def bucket_chunk(seed: int, n: int, w: int, v: int, alpha: int, num_vectors: int, num_centres: int):
+    """
+    Counts the pairs (x, c) of num_vectors random x of weight w and num_centres random centres c of weight v for which x is in the alpha-bucket of c, i.e. |x AND c| = alpha.
+    """
+    rng = np.random.default_rng(seed)
+    X = random_vectors(rng, num_vectors, n, w)
+    C = random_vectors(rng, num_centres, n, v)
+    hits = 0
+    for c in C: # The centres are few, the list is processed as a whole
+        hits += np.count_nonzero(popcount(X & c) == alpha)
+    return np.array([hits, num_vectors*num_centres])
+
+def solution_chunk(seed: int, n: int, w: int, v: int, alpha: int, list_size: int, num_centres: int, chunk: int):
+    """
+    Streams a list of list_size random vectors of weight w (in chunks of chunk vectors) through the alpha-buckets of num_centres random centres of weight v,
+    and counts the pairs in the buckets and the pairs among them with |x + y| = w.
+    The seed determines the centres, the list is the same for all seeds.
+    """
+    C = random_vectors(np.random.default_rng(seed), num_centres, n, v)
+    buckets = [[] for _ in C]
+    for start in range(0, list_size, chunk):
+        X = random_vectors(np.random.default_rng([start, n, w]), min(chunk, list_size - start), n, w)
+        for bucket, c in zip(buckets, C):
+            bucket.append(X[popcount(X & c) == alpha])
+    pairs, solutions = 0, 0
+    for bucket in buckets:
+        B = np.concatenate(bucket)
+        for start in range(0, len(B), 256): # Blocks of rows of the matrix of distances, where every pair is counted twice and x = y is not a solution
+            solutions += np.count_nonzero(popcount(B[start:start + 256, None] ^ B[None]) == w)
+        pairs += len(B)*(len(B) - 1)
+    return np.array([solutions, pairs])//2
+
+def wedge_chunk(seed: int, n: int, w: int, v: int, alpha: int, num_pairs: int, num_centres: int):
+    """
+    Counts the pairs ((x, y), c) of num_pairs random solution pairs and num_centres random centres c of weight v for which x and y are both in the alpha-bucket of c.
+    """
+    rng = np.random.default_rng(seed)
+    X, Y = random_solution_pairs(rng, num_pairs, n, w)
+    C = random_vectors(rng, num_centres, n, v)
+    hits = 0
+    for c in C:
+        hits += np.count_nonzero((popcount(X & c) == alpha) & (popcount(Y & c) == alpha))
+    return np.array([hits, num_pairs*num_centres])
+
+def run_chunks(fun, args: list, seeds: list, processes: int = None):
+    """
+    Sum of fun(seed, *args) over all seeds, computed by a pool of processes (by default one per CPU, no pool for one process).
+    """
+    if processes is None:
+        processes = os.cpu_count()
+    tasks = [(seed, *args) for seed in seeds]
+    if processes == 1:
+        return sum(fun(*task) for task in tasks)
+    with mp.get_context('spawn').Pool(processes) as pool:
+        return sum(pool.starmap(fun, tasks))
+
+##########################################################################
+#----------------------- COMPARISON WITH FORMULAS -----------------------#
+##########################################################################
+
+def log2_binom(n: int, k: int):
+    """
+    Exact log_2 of the binomial coefficient {n choose k} (-inf if k is not in [0, n]).
+    """
+    if k < 0 or k > n:
+        return -np.inf
+    return (lgamma(n + 1) - lgamma(k + 1) - lgamma(n - k + 1))/log(2)
+
+def log2_sum(L: list):
+    """
+    log_2 of the sum of 2^l for l in L.
+    """
+    m = max(L)
+    return m + np.log2(sum(2**(l - m) for l in L)) if m > -np.inf else -np.inf
+
+def exact_rates(n: int, w: int, v: int, alpha: int):
+    """
+    Exact log_2 rates (divided by n) at length n of bucket membership, of solutions among pairs in a bucket and of centres whose bucket contains a solution pair.
+    """
+    bucket = log2_binom(v, alpha) + log2_binom(n - v, w - alpha) - log2_binom(n, w)
+    t = w//2
+    wedge = log2_sum([log2_binom(t, e) + 2*log2_binom(w - t, alpha - e) + log2_binom(n - 2*w + t, v - 2*alpha + e) for e in range(0, min(t, alpha) + 1)]) - log2_binom(n, v)
+    solutions = log2_binom(w, t) + log2_binom(n - w, t) - log2_binom(n, w) # Probability that a pair of random vectors is a solution
+    prob = solutions + wedge - 2*bucket # Bayes' rule, as in NNS.prob
+    return {'bucket': bucket/n, 'prob': prob/n, 'wedge': wedge/n}
+
+def asymptotic_rates(n: int, w: int, v: int, alpha: int):
+    """
+    Log_2 rates of exact_rates predicted by the formulas of NNS (for the relative parameters w/n, v/n and alpha/n).
+    """
+    alg = RPC(1, w/n)
+    v, alpha = v/n, alpha/n
+    return {'bucket': -alg.num_buckets(v, alpha), # = bucket_size - list_size
+            'prob': alg.prob(v, alpha),
+            'wedge': alg.wedge_size(v, alpha)[1] - comb(1, v)}
+
+def simulate(n: int, omega: float, v_rel: float, alpha_rel: float, samples: int = 10**6, list_size: int = 10**5, num_centres: int = 64, chunk: int = 10**4, processes: int = None, seed: int = 0):
+    """
+    Empirical, exact and asymptotic log_2 rates (divided by n) at length n of bucket membership (see bucket_chunk), solutions among pairs in a bucket (see solution_chunk)
+    and centres whose bucket contains a solution pair (see wedge_chunk), where w, v and alpha are omega*n, v_rel*n and alpha_rel*n rounded (w even).
+    samples is the number of vectors (and of solution pairs) per centre for the bucket and wedge rates. Returns a list of rows [n, quantity, empirical, exact, asymptotic, hits].
+    """
+    w, v, alpha = 2*round(omega*n/2), round(v_rel*n), round(alpha_rel*n)
+    num_chunks = -(-samples//chunk)
+    seeds = [[seed, n, i] for i in range(num_chunks)]
+    counts = {
+        'bucket': run_chunks(bucket_chunk, [n, w, v, alpha, chunk, num_centres], seeds, processes),
+        'prob': run_chunks(solution_chunk, [n, w, v, alpha, list_size, 1, chunk], [[seed, n, i] for i in range(num_centres)], processes),
+        'wedge': run_chunks(wedge_chunk, [n, w, v, alpha, chunk, num_centres], seeds, processes),
+    }
+    exact, asymptotic = exact_rates(n, w, v, alpha), asymptotic_rates(n, w, v, alpha)
+    res = []
+    for quantity, (hits, total) in counts.items():
+        empirical = np.log2(hits/total)/n if hits > 0 else -np.inf
+        res.append([n, quantity, empirical, exact[quantity], asymptotic[quantity], int(hits)])
+    return res
+
+def validate(omega: float, v_rel: float, alpha_rel: float, lengths: list = [32, 64, 128, 256], **kwargs):
+    """
+    simulate for every length in lengths, which shows how the empirical rates approach the asymptotic formulas as n grows.
+    """
+    res = []
+    for n in lengths:
+        res += simulate(n, omega, v_rel, alpha_rel, **kwargs)
+    return res
+
+##########################################################################
+#--------------------------- DRIVER CODE --------------------------------#
+##########################################################################
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Monte Carlo validation of the bucket and wedge formulas of NNS at finite length.')
+    parser.add_argument('--omega', type = float, default = 0.1, help = 'relative weight w/n')
+    parser.add_argument('--v', type = float, default = 0.08, help = 'relative weight of the centres')
+    parser.add_argument('--alpha', type = float, default = 0.03, help = 'relative overlap of the buckets')
+    parser.add_argument('--lengths', type = int, nargs = '+', default = [32, 64, 128, 256])
+    parser.add_argument('--samples', type = int, default = 10**6, help = 'vectors (and solution pairs) per centre')
+    parser.add_argument('--list_size', type = int, default = 10**5, help = 'size of the list streamed through the buckets')
+    parser.add_argument('--centres', type = int, default = 64)
+    parser.add_argument('--processes', type = int, default = None)
+    args = parser.parse_args()
+
+    print('n', 'quantity', 'empirical', 'exact', 'asymptotic', 'hits')
+    for row in validate(args.omega, args.v, args.alpha, args.lengths, samples = args.samples, list_size = args.list_size, num_centres = args.centres, processes = args.processes):
+        print(row[0], row[1], *['%.5f' % x for x in row[2:5]], row[5])
@@ -0,0 +1,278 @@
+import argparse
+import itertools
+import multiprocessing as mp
+import os
+import time
+import numpy as np
+from misc import comb, list_size
+from lsf.gjn import GJN
+from lsf.rpc import RPC, RPCOpt
+from simulation import pack, popcount, random_supports, random_vectors, exact_rates
+
+##########################################################################
+#------------------------------ INSTANCES -------------------------------#
+##########################################################################
+
+class Instance:
+    """
+    List of size random vectors of length n and weight w. Every vector is stored bit-packed (L), and also its two halves of length n//2 and n - n//2 (L1, L2) for the product code of solve_rpc.
+    The supports are kept for solve_gjn.
+    """
+
+    def __init__(self, n: int, w: int, size: int, seed: int = 0, chunk: int = 10**5):
+        self.n, self.w, self.size = n, w, size
+        self.n1 = n//2
+        rng = np.random.default_rng(seed)
+        L, L1, L2, S = [], [], [], []
+        for start in range(0, size, chunk):
+            num = min(chunk, size - start)
+            supports = np.sort(random_supports(rng, num, n, w)[:, :w], axis=1)
+            B = np.zeros((num, n), dtype=bool)
+            np.put_along_axis(B, supports, True, axis=1)
+            L.append(pack(B))
+            L1.append(pack(B[:, :self.n1]))
+            L2.append(pack(B[:, self.n1:]))
+            S.append(supports.astype(np.int16))
+        self.L, self.L1, self.L2, self.supports = np.concatenate(L), np.concatenate(L1), np.concatenate(L2), np.concatenate(S)
+
+    @property
+    def nbytes(self):
+        return self.L.nbytes + self.L1.nbytes + self.L2.nbytes + self.supports.nbytes
+
+def close_pairs(L, first, second, w: int):
+    """
+    The pairs (first[k], second[k]) of indices into L with |L[first[k]] + L[second[k]]| = w, as an array of shape (number of pairs, 2) with the smaller index first.
+    """
+    close = popcount(L[first] ^ L[second]) == w
+    return np.sort(np.column_stack([first[close], second[close]]), axis=1)
+
+def pairs_in_groups(order, sizes):
+    """
+    All pairs of elements in the same group, where order lists the elements group after group and sizes are the sizes of the groups. Returns two arrays of elements.
+    """
+    starts = np.cumsum(sizes) - sizes
+    group_start = np.repeat(starts, sizes)
+    rank = np.arange(len(order)) - group_start
+    later = np.repeat(sizes, sizes) - rank - 1 # Number of later elements in the same group
+    pos = np.repeat(np.arange(len(order)), later)
+    offset = np.arange(len(pos)) - np.repeat(np.cumsum(later) - later, later)
+    return order[pos], order[pos + 1 + offset]
+
+def close_pairs_in_groups(L, order, sizes, w: int, max_pairs: int = 2**22):
+    """
+    The close pairs (see close_pairs) among the elements in the same group (see pairs_in_groups), checked in batches of consecutive groups with about max_pairs pairs.
+    A group with more than max_pairs pairs is a batch on its own, which is checked in blocks of rows of its matrix of pairs. Returns the close pairs and the number of pairs checked.
+    """
+    starts = np.cumsum(sizes) - sizes
+    num_pairs = sizes*(sizes - 1)//2
+    cumulative = np.cumsum(num_pairs)
+    big = np.nonzero(num_pairs > max_pairs)[0]
+    cuts = set(np.searchsorted(cumulative, np.arange(max_pairs, cumulative[-1] if len(sizes) else 0, max_pairs), side = 'right')) | set(big) | set(big + 1) | {0, len(sizes)}
+    cuts = sorted(c for c in cuts if c <= len(sizes))
+    found, checked = [np.empty((0, 2), dtype = np.int64)], 0
+    for g0, g1 in zip(cuts[:-1], cuts[1:]):
+        G = order[starts[g0]:starts[g0] + sizes[g0:g1].sum()]
+        if g1 == g0 + 1 and num_pairs[g0] > max_pairs:
+            rows = max(1, max_pairs//len(G))
+            for r in range(0, len(G), rows):
+                i = np.repeat(np.arange(r, min(r + rows, len(G))), len(G))
+                j = np.tile(np.arange(len(G)), min(r + rows, len(G)) - r)
+                i, j = i[j > i], j[j > i]
+                found.append(close_pairs(L, G[i], G[j], w))
+                checked += len(i)
+        else:
+            first, second = pairs_in_groups(G, sizes[g0:g1])
+            found.append(close_pairs(L, first, second, w))
+            checked += len(first)
+    return np.concatenate(found), checked
+
+##########################################################################
+#------------------------------ RPC SOLVER ------------------------------#
+##########################################################################
+
+# The centres form a random product code C1 x C2 of two random codes of weight v1 = v//2 and v2 = v - v1 on the two halves of the coordinates.
+# Then x is in the alpha-bucket of (c1, c2) iff |x1 AND c1| + |x2 AND c2| = alpha, so the buckets of x are found from its overlaps with C1 and C2 (list decoding),
+# without testing all |C1|*|C2| centres. The rows of C1 are processed in blocks: for each block, the inverted index bucket -> list elements is built, the close pairs
+# in the buckets are found and the index is discarded, which bounds the memory. Blocks are processed in parallel.
+
+_state = {}
+
+def _init_worker(instance, C1, C2, v1: int, v2: int, alpha: int, chunk: int):
+    _state.update(instance = instance, C1 = C1, C2 = C2, v1 = v1, v2 = v2, alpha = alpha, chunk = chunk)
+
+def decode(O1, O2, alpha: int, v1: int, v2: int):
+    """
+    List decoding in the product code: given the overlaps O1 (shape (m, K1)) and O2 (shape (m, K2)) of m vectors with C1 and C2,
+    returns the arrays (x, i, j) of all triples with O1[x, i] + O2[x, j] = alpha.
+    """
+    X, I, J = [], [], []
+    m = len(O1)
+    for a in range(max(0, alpha - v2), min(alpha, v1) + 1):
+        x1, i = np.nonzero(O1 == a)
+        x2, j = np.nonzero(O2 == alpha - a)
+        c1, c2 = np.bincount(x1, minlength = m), np.bincount(x2, minlength = m)
+        k = c1*c2 # Number of buckets of x with overlap a on the first half
+        x = np.repeat(np.arange(m), k)
+        r = np.arange(len(x)) - np.repeat(np.cumsum(k) - k, k)
+        X.append(x)
+        I.append(i[(np.cumsum(c1) - c1)[x] + r//c2[x]])
+        J.append(j[(np.cumsum(c2) - c2)[x] + r % c2[x]])
+    return np.concatenate(X), np.concatenate(I), np.concatenate(J)
+
+def rpc_block(block):
+    """
+    Finds the close pairs in the buckets of the centres with first component in C1[block], streaming the list in chunks.
+    Returns the close pairs, the number of overlaps computed, the number of index entries, the number of pairs checked and the time of bucketing and checking.
+    """
+    inst, C1, C2, alpha, chunk = _state['instance'], _state['C1'][block[0]:block[1]], _state['C2'], _state['alpha'], _state['chunk']
+    t0 = time.perf_counter()
+    elements, buckets = [], []
+    for start in range(0, inst.size, chunk):
+        X1, X2 = inst.L1[start:start + chunk], inst.L2[start:start + chunk]
+        O1 = popcount(X1[:, None, :] & C1[None, :, :]).astype(np.int16)
+        O2 = popcount(X2[:, None, :] & C2[None, :, :]).astype(np.int16)
+        x, i, j = decode(O1, O2, alpha, _state['v1'], _state['v2'])
+        elements.append(start + x)
+        buckets.append(i*len(C2) + j)
+    elements, buckets = np.concatenate(elements), np.concatenate(buckets)
+    order = np.argsort(buckets, kind = 'stable') # Inverted index: the elements of every bucket are contiguous
+    _, sizes = np.unique(buckets[order], return_counts = True)
+    t1 = time.perf_counter()
+    pairs, checked = close_pairs_in_groups(inst.L, elements[order], sizes, inst.w)
+    t2 = time.perf_counter()
+    return pairs, inst.size*(len(C1) + len(C2)), len(elements), checked, t1 - t0, t2 - t1
+
+def solve_rpc(instance: Instance, v: int, alpha: int, num_centres: int, block: int = 8, chunk: int = 10**4, processes: int = None, seed: int = 0):
+    """
+    Finds close pairs (|x + y| = w) in the instance with the alpha-RPC with about num_centres centres of weight v, see rpc_block.
+    Returns a dictionary with the distinct close pairs, the operations (overlaps, index entries and pairs checked), the peak number of index entries of a block and the times.
+    """
+    rng = np.random.default_rng(seed)
+    K = max(1, int(np.ceil(np.sqrt(num_centres))))
+    v1 = v//2
+    v2 = v - v1
+    C1 = random_vectors(rng, K, instance.n1, v1)
+    C2 = random_vectors(rng, K, instance.n - instance.n1, v2)
+    blocks = [(start, min(start + block, K)) for start in range(0, K, block)]
+    if processes is None:
+        processes = os.cpu_count()
+
+    t0 = time.perf_counter()
+    args = (instance, C1, C2, v1, v2, alpha, chunk)
+    if processes == 1:
+        _init_worker(*args)
+        results = [rpc_block(b) for b in blocks]
+    else:
+        with mp.get_context('spawn').Pool(processes, initializer = _init_worker, initargs = args) as pool:
+            results = pool.map(rpc_block, blocks)
+    wall = time.perf_counter() - t0
+
+    pairs = np.unique(np.concatenate([r[0] for r in results]), axis = 0)
+    overlaps, entries, checked = (sum(r[k] for r in results) for k in range(1, 4))
+    return {'pairs': pairs, 'centres': K*K, 'operations': overlaps + entries + checked, 'overlaps': overlaps, 'entries': entries, 'checked': checked,
+            'memory': instance.size + max(r[2] for r in results), 'time': wall, 'time_bucketing': sum(r[4] for r in results), 'time_checking': sum(r[5] for r in results)}
+
+##########################################################################
+#------------------------------ GJN SOLVER ------------------------------#
+##########################################################################
+
+# x and y with |x + y| = w share exactly w/2 positions of their supports. Every vector is stored under the hashes of all w/2-subsets of its support,
+# and vectors with equal hashes are checked. The hashes are split into partitions by their residue, which are processed in parallel.
+# Every partition computes all hashes again but only stores its own, which bounds the memory by max_keys hashes per partition.
+
+def _init_gjn_worker(instance, combos, zobrist, partitions: int, chunk: int):
+    _state.update(instance = instance, combos = combos, zobrist = zobrist, partitions = partitions, chunk = chunk)
+
+def gjn_partition(p: int):
+    """
+    Finds the close pairs among the vectors that share a w/2-subset of their supports whose hash is p modulo the number of partitions.
+    Returns the close pairs, the number of hashes computed, the number of hashes stored, the number of pairs checked and the time.
+    """
+    inst, combos, zobrist, partitions, chunk = _state['instance'], _state['combos'], _state['zobrist'], _state['partitions'], _state['chunk']
+    t0 = time.perf_counter()
+    elements, keys = [], []
+    rows = max(1, chunk//len(combos))
+    for start in range(0, inst.size, rows):
+        for c_start in range(0, len(combos), chunk): # Bounds the array of shape (rows, subsets, w/2) 
+            S = inst.supports[start:start + rows]
+            H = np.bitwise_xor.reduce(zobrist[S[:, combos[c_start:c_start + chunk]]], axis = 2) # Hashes of the w/2-subsets
+            x, c = np.nonzero(H % np.uint64(partitions) == p)
+            elements.append(start + x)
+            keys.append(H[x, c])
+    elements, keys = np.concatenate(elements), np.concatenate(keys)
+    order = np.argsort(keys, kind = 'stable')
+    _, sizes = np.unique(keys[order], return_counts = True)
+    pairs, checked = close_pairs_in_groups(inst.L, elements[order], sizes, inst.w)
+    return pairs, inst.size*len(combos), len(keys), checked, time.perf_counter() - t0
+
+def solve_gjn(instance: Instance, max_keys: int = 10**7, chunk: int = 2**16, processes: int = None, seed: int = 0):
+    """
+    Finds all close pairs (|x + y| = w) in the instance, see gjn_partition, with at least one partition per process. Returns a dictionary as solve_rpc.
+    """
+    w = instance.w
+    combos = np.array(list(itertools.combinations(range(w), w//2)), dtype = np.int16)
+    zobrist = np.random.default_rng(seed).integers(0, 2**64, size = instance.n, dtype = np.uint64, endpoint = False)
+    if processes is None:
+        processes = os.cpu_count()
+    partitions = max(processes, -(-instance.size*len(combos)//max_keys))
+
+    t0 = time.perf_counter()
+    args = (instance, combos, zobrist, partitions, chunk)
+    if processes == 1:
+        _init_gjn_worker(*args)
+        results = [gjn_partition(p) for p in range(partitions)]
+    else:
+        with mp.get_context('spawn').Pool(processes, initializer = _init_gjn_worker, initargs = args) as pool:
+            results = pool.map(gjn_partition, range(partitions))
+    wall = time.perf_counter() - t0
+
+    pairs = np.unique(np.concatenate([r[0] for r in results]), axis = 0)
+    hashes, checked = sum(r[1] for r in results), sum(r[3] for r in results)
+    return {'pairs': pairs, 'operations': hashes + checked, 'hashes': hashes, 'checked': checked,
+            'memory': instance.size + max(r[2] for r in results), 'time': wall, 'time_checking': sum(r[4] for r in results)}
+
+##########################################################################
+#------------------------ COMPARISON WITH MODELS ------------------------#
+##########################################################################
+
+def compare(n: int, omega: float, size: int = None, reps: float = 1., iters: int = 10, processes: int = None, seed: int = 0):
+    """
+    Runs solve_rpc (with the parameters of RPCOpt for the weight omega, rounded to length n) and solve_gjn on a random instance of length n and weight omega*n (rounded to an even number),
+    by default of the list size of the models. The number of centres is reps times the inverse of the exact probability that a close pair shares a bucket.
+    Returns rows [alg, n, size, close pairs found, wall time, log_2(operations)/n, predicted runtime, log_2(memory)/n, predicted memory], where memory is counted in vectors.
+    """
+    w = 2*round(omega*n/2)
+    omega = w/n
+    if size is None:
+        size = int(round(2**(n*list_size(1, omega))))
+    inst = Instance(n, w, size, seed)
+
+    rpc = RPC(1, omega)
+    v_rel, alpha_rel = RPCOpt(rpc).optimize(iters)
+    v, alpha = round(v_rel*n), round(alpha_rel*n)
+    num_centres = reps*2**(-n*exact_rates(n, w, v, alpha)['wedge'])
+    res_rpc = solve_rpc(inst, v, alpha, num_centres, processes = processes, seed = seed)
+    res_gjn = solve_gjn(inst, processes = processes, seed = seed)
+
+    gjn = GJN(1, omega)
+    rows = []
+    for name, res, t, m in [('RPC', res_rpc, rpc.runtime(v/n, alpha/n), rpc.memory(v/n, alpha/n)), ('GJN', res_gjn, gjn.runtime(), gjn.memory())]:
+        rows.append([name, n, size, len(res['pairs']), res['time'], np.log2(res['operations'])/n, t, np.log2(res['memory'])/n, m])
+    return rows
+
+##########################################################################
+#--------------------------- DRIVER CODE --------------------------------#
+##########################################################################
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Runs the RPC and GJN near-neighbour solvers on random instances and compares them with the cost models.')
+    parser.add_argument('--omega', type = float, default = 0.1, help = 'relative weight w/n')
+    parser.add_argument('--lengths', type = int, nargs = '+', default = [40, 60, 80])
+    parser.add_argument('--size', type = int, default = None, help = 'list size (default: list_size of the models)')
+    parser.add_argument('--reps', type = float, default = 1., help = 'centres relative to the inverse probability that a close pair shares a bucket')
+    parser.add_argument('--processes', type = int, default = None)
+    args = parser.parse_args()
+
+    print('alg', 'n', 'size', 'pairs', 'time', 'operations', 'runtime', 'memory', 'model_memory')
+    for n in args.lengths:
+        for row in compare(n, args.omega, args.size, args.reps, processes = args.processes):
+            print(*row[:4], *['%.4f' % x for x in row[4:]])
@@ -0,0 +1,218 @@
+import argparse
+import json
+import multiprocessing as mp
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+from main import alg_choice, sweep_weights, time_memory_weight, write_results, results_filename
+
+##########################################################################
+#------------------------------ WORK QUEUE ------------------------------#
+##########################################################################
+
+# A sweep of main.time_memory is split into units (algorithm, weight, optimizer settings), which are stored in an SQLite database in a shared directory.
+# Workers on any number of nodes claim a unit with a lease, compute it and commit the result atomically. Units of crashed workers are claimed again once their lease expires.
+# A unit whose computation raises an exception, or whose lease expired max_attempts times (e.g. because it crashes its workers), is marked as failed with the error.
+# NB: SQLite relies on the file locks of the shared file system, which should therefore support them (e.g. NFS with lockd).
+
+def connect(db: str):
+    """
+    Opens the queue database, where transactions are started explicitly.
+    """
+    conn = sqlite3.connect(db, timeout = 60, isolation_level = None)
+    conn.execute('PRAGMA busy_timeout = 60000')
+    return conn
+
+def create_queue(db: str, alg_names: list, range_weights = 100, iters = 20, prec = 1e-10, min_val = 1000, max_iter = 2000, smooth = False):
+    """
+    Creates the units of the sweep of time_memory over all weights for every algorithm in alg_names. Units that are already in the queue are kept.
+    Returns the number of units.
+    """
+    conn = connect(db)
+    conn.execute('''CREATE TABLE IF NOT EXISTS units (
+                        id INTEGER PRIMARY KEY,
+                        alg_name TEXT, w REAL, range_weights INTEGER, iters INTEGER, prec REAL, min_val REAL, max_iter INTEGER, smooth INTEGER,
+                        status TEXT DEFAULT 'pending', worker TEXT, lease_until REAL, attempts INTEGER DEFAULT 0, result TEXT, error TEXT,
+                        UNIQUE (alg_name, w, range_weights, iters, prec, min_val, max_iter, smooth))''')
+    if 'error' not in [row[1] for row in conn.execute('PRAGMA table_info(units)')]: # Queues created before units could fail
+        conn.execute('ALTER TABLE units ADD COLUMN error TEXT')
+    conn.execute('BEGIN IMMEDIATE')
+    for alg_name in alg_names:
+        for w in sweep_weights(range_weights, smooth):
+            conn.execute('INSERT OR IGNORE INTO units (alg_name, w, range_weights, iters, prec, min_val, max_iter, smooth) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                         (alg_name, w, range_weights, iters, prec, min_val, max_iter, int(smooth)))
+    conn.execute('COMMIT')
+    num_units = conn.execute('SELECT COUNT(*) FROM units').fetchone()[0]
+    conn.close()
+    return num_units
+
+def expire(conn, max_attempts: int):
+    """
+    Marks the running units whose lease has expired after max_attempts attempts as failed. To be called inside a transaction.
+    """
+    conn.execute("UPDATE units SET status = 'failed', error = ? WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                 ('lease expired after ' + str(max_attempts) + ' attempts', time.time(), max_attempts))
+
+def claim(conn, worker: str, lease: float, max_attempts: int = 3):
+    """
+    Atomically claims a pending unit, or a running unit whose lease has expired and that has been attempted less than max_attempts times.
+    Returns the unit as a dictionary, or None if there is none.
+    """
+    now = time.time()
+    conn.execute('BEGIN IMMEDIATE')
+    expire(conn, max_attempts)
+    row = conn.execute('''SELECT id, alg_name, w, iters, prec, min_val, max_iter, smooth FROM units
+                          WHERE status = 'pending' OR (status = 'running' AND lease_until < ?)
+                          ORDER BY id LIMIT 1''', (now,)).fetchone()
+    if row is None:
+        conn.execute('COMMIT')
+        return None
+    conn.execute("UPDATE units SET status = 'running', worker = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?", (worker, now + lease, row[0]))
+    conn.execute('COMMIT')
+    keys = ['id', 'alg_name', 'w', 'iters', 'prec', 'min_val', 'max_iter', 'smooth']
+    return dict(zip(keys, row))
+
+def renew(conn, unit_id: int, worker: str, lease: float):
+    """
+    Extends the lease of a unit, as long as it is still held by worker.
+    """
+    conn.execute("UPDATE units SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'", (time.time() + lease, unit_id, worker))
+
+def commit(conn, unit_id: int, worker: str, result: list):
+    """
+    Atomically stores the result of a unit. Returns 'False' if the lease was lost to another worker, in which case the result is discarded.
+    """
+    cursor = conn.execute("UPDATE units SET status = 'done', result = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                          (json.dumps(result, default = float), unit_id, worker))
+    return cursor.rowcount == 1
+
+def fail(conn, unit_id: int, worker: str, error: str):
+    """
+    Marks a unit as failed with error, as long as it is still held by worker.
+    """
+    conn.execute("UPDATE units SET status = 'failed', error = ? WHERE id = ? AND worker = ? AND status = 'running'", (error, unit_id, worker))
+
+def compute(unit: dict):
+    """
+    Computes the row [w, t, m, params] of time_memory for a unit.
+    """
+    alg, optimizer, _ = alg_choice(unit['alg_name'])
+    return time_memory_weight(alg, optimizer, unit['w'], unit['iters'], unit['prec'], unit['min_val'], unit['max_iter'], bool(unit['smooth']))
+
+def run_worker(db: str, worker: str = None, lease: float = 600, max_attempts: int = 3):
+    """
+    Claims, computes and commits units until the queue is empty. While a unit is computed, its lease is renewed every lease/3 seconds.
+    A unit whose computation raises an exception is marked as failed with the traceback, and the worker continues with the next unit.
+    Returns the number of units committed by this worker.
+    """
+    if worker is None:
+        worker = socket.gethostname() + ':' + str(os.getpid())
+    conn = connect(db)
+    num_done = 0
+    while True:
+        unit = claim(conn, worker, lease, max_attempts)
+        if unit is None:
+            break
+
+        stop = threading.Event()
+        def heartbeat():
+            heartbeat_conn = connect(db)
+            while not stop.wait(lease/3):
+                renew(heartbeat_conn, unit['id'], worker, lease)
+            heartbeat_conn.close()
+        thread = threading.Thread(target = heartbeat, daemon = True)
+        thread.start()
+        try:
+            result = compute(unit)
+        except Exception:
+            fail(conn, unit['id'], worker, traceback.format_exc())
+            continue
+        finally:
+            stop.set()
+            thread.join()
+        if commit(conn, unit['id'], worker, result):
+            num_done += 1
+    conn.close()
+    return num_done
+
+def run_local_workers(db: str, num_workers: int = None, lease: float = 600, max_attempts: int = 3):
+    """
+    Runs num_workers worker processes on this node (by default one per CPU) until the queue is empty.
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count()
+    with mp.get_context('spawn').Pool(num_workers) as pool:
+        return sum(pool.starmap(run_worker, [(db, None, lease, max_attempts)]*num_workers))
+
+def failed_units(conn):
+    """
+    Returns the failed units as rows (alg_name, w, attempts, error).
+    """
+    return conn.execute("SELECT alg_name, w, attempts, error FROM units WHERE status = 'failed' ORDER BY alg_name, w").fetchall()
+
+def progress(db: str, max_attempts: int = 3):
+    """
+    Returns the number of units per status and the failed units (see failed_units), where units whose lease expired after max_attempts attempts count as failed.
+    """
+    conn = connect(db)
+    conn.execute('BEGIN IMMEDIATE')
+    expire(conn, max_attempts)
+    conn.execute('COMMIT')
+    counts = dict(conn.execute('SELECT status, COUNT(*) FROM units GROUP BY status').fetchall())
+    failed = failed_units(conn)
+    conn.close()
+    return counts, failed
+
+def collect(db: str, data_dir: str = None):
+    """
+    Assembles the results of the finished units into one table per algorithm and settings (sorted by weight), as returned by time_memory.
+    If data_dir is given, every table is written as in main.py. Returns a dictionary (alg_name, range_weights, iters, prec, min_val, max_iter, smooth) -> table
+    and the failed units (see failed_units), whose weights are missing from the tables.
+    """
+    conn = connect(db)
+    rows = conn.execute("SELECT alg_name, range_weights, iters, prec, min_val, max_iter, smooth, result FROM units WHERE status = 'done' ORDER BY alg_name, w").fetchall()
+    failed = failed_units(conn)
+    conn.close()
+    tables = {}
+    for *settings, result in rows:
+        tables.setdefault(tuple(settings[:-1]) + (bool(settings[-1]),), []).append(json.loads(result))
+    if data_dir is not None:
+        for settings, L in tables.items():
+            write_results(L, data_dir, results_filename(*settings))
+    return tables, failed
+
+##########################################################################
+#--------------------------- DRIVER CODE --------------------------------#
+##########################################################################
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Sweep of main.time_memory over a work queue in a shared directory.')
+    parser.add_argument('command', choices = ['create', 'work', 'status', 'collect'])
+    parser.add_argument('db', help = 'path of the SQLite queue, in a directory shared by all nodes')
+    parser.add_argument('--algs', nargs = '+', default = ['RPC', 'RPC_Grover', 'RPC_quantum_walk', 'RPC_quantum_walk_sparsification'])
+    parser.add_argument('--range_weights', type = int, default = 100)
+    parser.add_argument('--iters', type = int, default = 20)
+    parser.add_argument('--prec', type = float, default = 1e-10)
+    parser.add_argument('--smooth', action = 'store_true')
+    parser.add_argument('--workers', type = int, default = None, help = 'number of worker processes on this node')
+    parser.add_argument('--lease', type = float, default = 600, help = 'seconds after which units of unresponsive workers are claimed again')
+    parser.add_argument('--max_attempts', type = int, default = 3, help = 'attempts after which a unit whose lease keeps expiring is marked as failed')
+    parser.add_argument('--data_dir', default = '../data/')
+    args = parser.parse_args()
+
+    if args.command == 'create':
+        print("Units in queue: ", create_queue(args.db, args.algs, args.range_weights, args.iters, args.prec, smooth = args.smooth))
+    elif args.command == 'work':
+        print("Units computed: ", run_local_workers(args.db, args.workers, args.lease, args.max_attempts))
+    elif args.command == 'status':
+        counts, failed = progress(args.db, args.max_attempts)
+        print(counts)
+    else:
+        tables, failed = collect(args.db, args.data_dir)
+        for key, L in tables.items():
+            print(key[0], "weights :", len(L), ", worst-case complexity :", max(L, key=lambda x: x[1])[1])
+    if args.command in ['status', 'collect']:
+        for alg_name, w, attempts, error in failed:
+            print("Failed :", alg_name, "w =", w, "after", attempts, "attempt(s) :", error.strip().splitlines()[-1])